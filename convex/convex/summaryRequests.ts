@@ -1,43 +1,71 @@
-import { mutation, query } from "./_generated/server";
-import { v } from "convex/values";
+import { paginationOptsValidator } from "convex/server";
+import { mutation, query, type MutationCtx } from "./_generated/server";
+import { v, type ObjectType } from "convex/values";
 import { validateApiKey } from "./auth";
 
+const summaryRequest = {
+  userId: v.string(),
+  source: v.string(),
+  videoId: v.string(),
+  title: v.string(),
+  author: v.string(),
+  thumbnailUrl: v.string(),
+  length: v.number(),
+};
+
+async function upsertOne(
+  ctx: MutationCtx,
+  data: ObjectType<typeof summaryRequest>
+) {
+  const existing = await ctx.db
+    .query("summary_requests")
+    .withIndex("by_user_and_video", (q) =>
+      q
+        .eq("userId", data.userId)
+        .eq("source", data.source)
+        .eq("videoId", data.videoId)
+    )
+    .first();
+
+  if (existing) {
+    await ctx.db.patch(existing._id, { ...data, createdAt: Date.now() });
+    return existing._id;
+  }
+
+  return await ctx.db.insert("summary_requests", {
+    ...data,
+    createdAt: Date.now(),
+  });
+}
+
 // Upsert summary request (create or update if exists)
 export const upsert = mutation({
   args: {
     apiKey: v.string(),
-    userId: v.string(),
-    source: v.string(),
-    videoId: v.string(),
-    title: v.string(),
-    author: v.string(),
-    thumbnailUrl: v.string(),
-    length: v.number(),
+    ...summaryRequest,
   },
   handler: async (ctx, args) => {
     validateApiKey(args.apiKey);
 
     const { apiKey, ...data } = args;
+    return await upsertOne(ctx, data);
+  },
+});
 
-    const existing = await ctx.db
-      .query("summary_requests")
-      .withIndex("by_user_and_video", (q) =>
-        q
-          .eq("userId", data.userId)
-          .eq("source", data.source)
-          .eq("videoId", data.videoId)
-      )
-      .first();
-
-    if (existing) {
-      await ctx.db.patch(existing._id, { ...data, createdAt: Date.now() });
-      return existing._id;
-    }
+// Upsert a batch of summary requests in one transaction
+export const upsertMany = mutation({
+  args: {
+    apiKey: v.string(),
+    requests: v.array(v.object(summaryRequest)),
+  },
+  handler: async (ctx, args) => {
+    validateApiKey(args.apiKey);
 
-    return await ctx.db.insert("summary_requests", {
-      ...data,
-      createdAt: Date.now(),
-    });
+    const ids = [];
+    for (const data of args.requests) {
+      ids.push(await upsertOne(ctx, data));
+    }
+    return ids;
   },
 });
 
@@ -57,3 +85,21 @@ export const listByUser = query({
       .collect();
   },
 });
+
+// Get one page of a user's summary request history, newest first
+export const listByUserPage = query({
+  args: {
+    apiKey: v.string(),
+    userId: v.string(),
+    paginationOpts: paginationOptsValidator,
+  },
+  handler: async (ctx, args) => {
+    validateApiKey(args.apiKey);
+
+    return await ctx.db
+      .query("summary_requests")
+      .withIndex("by_user", (q) => q.eq("userId", args.userId))
+      .order("desc")
+      .paginate(args.paginationOpts);
+  },
+});
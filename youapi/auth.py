@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Any
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives import serialization
+from jwt.algorithms import RSAAlgorithm
+
+from cache import LRUCache
+from concurrency import Lazy, run_blocking
+
+if TYPE_CHECKING:
+    from clerk_backend_api import Clerk
+    from clerk_backend_api.security.types import RequestState
+
+logger = logging.getLogger(__name__)
+
+CLERK_API_URL = os.environ.get("CLERK_API_URL", "https://api.clerk.com")
+# PEM public key from the Clerk dashboard; when set, no JWKS is fetched at all
+CLERK_JWT_KEY = os.environ.get("CLERK_JWT_KEY")
+
+# Signing keys are refetched every JWKS_REFRESH_SECONDS in the background, and at
+# most every JWKS_MIN_REFRESH_SECONDS when a token names an unknown key (rotation)
+JWKS_REFRESH_SECONDS = float(os.environ.get("JWKS_REFRESH_SECONDS", 3600))
+JWKS_MIN_REFRESH_SECONDS = float(os.environ.get("JWKS_MIN_REFRESH_SECONDS", 10))
+JWKS_TIMEOUT = float(os.environ.get("JWKS_TIMEOUT", 5))
+
+# Verified tokens are remembered until their exp, but never longer than AUTH_CACHE_MAX_TTL
+AUTH_CACHE_MAX_BYTES = int(os.environ.get("AUTH_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+AUTH_CACHE_MAX_TTL = float(os.environ.get("AUTH_CACHE_MAX_TTL", 300))
+
+
+def session_token(request) -> str | None:
+    """The token Clerk reads: the Authorization bearer token, else the __session cookie."""
+    authorization = request.headers.get("Authorization")
+    if authorization is not None:
+        return authorization.replace("Bearer ", "")
+    for name, value in request.cookies.items():
+        if name.startswith("__session"):
+            return value
+    return None
+
+
+def jwk_to_pem(jwk: dict[str, Any]) -> str | None:
+    try:
+        public_key = RSAAlgorithm.from_jwk(jwk)
+    except (jwt.InvalidKeyError, KeyError, ValueError):
+        return None
+    if not hasattr(public_key, "public_bytes"):
+        return None
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+
+
+class JWKSCache:
+    """Clerk's signing keys as PEM by kid, refreshed off the request path."""
+
+    def __init__(self, secret_key: str | None, api_url: str = CLERK_API_URL):
+        self.secret_key = secret_key
+        self.url = f"{api_url.rstrip('/')}/v1/jwks"
+        self.keys: dict[str, str] = {}
+        self.fetched_at = 0.0
+        self.refreshes = 0
+        self.failures = 0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> None:
+        async with httpx.AsyncClient(timeout=JWKS_TIMEOUT) as client:
+            response = await client.get(
+                self.url,
+                headers={"Accept": "application/json", "Authorization": f"Bearer {self.secret_key}"},
+            )
+        response.raise_for_status()
+        keys = {}
+        for jwk in response.json().get("keys") or []:
+            pem = jwk_to_pem(jwk)
+            if pem is not None and jwk.get("kid"):
+                keys[jwk["kid"]] = pem
+        self.keys = keys
+        self.fetched_at = time.monotonic()
+        self.refreshes += 1
+
+    async def get(self, kid: str | None) -> str | None:
+        """PEM for kid, refetching once if it is unknown (the keys may have rotated)."""
+        pem = self.keys.get(kid)
+        if pem is not None or not self.secret_key:
+            return pem
+        async with self._lock:
+            if kid not in self.keys and time.monotonic() - self.fetched_at >= JWKS_MIN_REFRESH_SECONDS:
+                try:
+                    await self.refresh()
+                except (httpx.HTTPError, ValueError):
+                    self.failures += 1
+                    # Do not retry on every request while Clerk is unreachable
+                    self.fetched_at = time.monotonic()
+                    logger.warning("JWKS fetch failed", exc_info=True)
+        return self.keys.get(kid)
+
+    async def run(self) -> None:
+        """Keep the keys fresh; runs for the lifetime of the app."""
+        while True:
+            try:
+                await self.refresh()
+            except (httpx.HTTPError, ValueError):
+                self.failures += 1
+                logger.warning("JWKS refresh failed, keeping %d cached keys", len(self.keys), exc_info=True)
+            await asyncio.sleep(JWKS_REFRESH_SECONDS)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "keys": len(self.keys),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "age": time.monotonic() - self.fetched_at if self.fetched_at else None,
+        }
+
+
+def _clerk_client(secret_key: str | None) -> "Clerk":
+    from clerk_backend_api import Clerk
+
+    return Clerk(bearer_auth=secret_key)
+
+
+def _kid_mismatch() -> "RequestState":
+    from clerk_backend_api.security.types import AuthStatus, RequestState, TokenVerificationErrorReason
+
+    return RequestState(status=AuthStatus.SIGNED_OUT, reason=TokenVerificationErrorReason.JWK_KID_MISMATCH)
+
+
+class ClerkAuthenticator:
+    """
+    clerk.authenticate_request with verified tokens cached until they expire.
+
+    Session tokens are verified networkless against the locally cached JWKS, in the
+    "clerk" pool so RSA verification never runs on the event loop. While no JWKS
+    could be fetched, verification falls back to the SDK's own lookup. The SDK is
+    imported and its client built in that pool on the first cache miss.
+    """
+
+    def __init__(self, secret_key: str | None, jwt_key: str | None = CLERK_JWT_KEY):
+        self.clerk: "Lazy[Clerk]" = Lazy(lambda: _clerk_client(secret_key))
+        self.jwt_key = jwt_key
+        self.jwks = JWKSCache(secret_key)
+        self.tokens: "LRUCache[tuple[RequestState, float]]" = LRUCache(AUTH_CACHE_MAX_BYTES)
+        self.hits = 0
+        self.misses = 0
+
+    def _authenticate_request(self, request, jwt_key: str | None) -> "RequestState":
+        from clerk_backend_api.security import AuthenticateRequestOptions
+
+        return self.clerk.get().authenticate_request(request, AuthenticateRequestOptions(jwt_key=jwt_key))
+
+    async def authenticate(self, request) -> "RequestState":
+        token = session_token(request)
+        if not token:
+            return await run_blocking("clerk", self._authenticate_request, request, None)
+
+        key = hashlib.sha256(token.encode()).hexdigest()
+        cached = self.tokens.get(key)
+        if cached is not None:
+            state, expires_at = cached
+            if time.time() < expires_at:
+                self.hits += 1
+                return state
+            self.tokens.delete(key)
+        self.misses += 1
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError:
+            kid = None  # Not a JWT, e.g. a machine token: the SDK decides
+        jwt_key = self.jwt_key or (await self.jwks.get(kid) if kid else None)
+        if jwt_key is None and kid and self.jwks.keys:
+            # The JWKS was refetched for this kid (or very recently) and has no such key
+            return await run_blocking("clerk", _kid_mismatch)
+
+        state = await run_blocking("clerk", self._authenticate_request, request, jwt_key)
+        if state.is_signed_in:
+            expires_at = time.time() + AUTH_CACHE_MAX_TTL
+            if isinstance((state.payload or {}).get("exp"), (int, float)):
+                expires_at = min(expires_at, state.payload["exp"])
+            self.tokens.set(key, (state, expires_at), len(token) + len(str(state.payload)))
+        return state
+
+    def report(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": len(self.tokens),
+            "jwks": self.jwks.report(),
+        }
@@ -0,0 +1,127 @@
+"""
+Per-request cost of Clerk token verification in clerk_auth_middleware.
+
+"before" is the previous middleware: clerk.authenticate_request in the "clerk" pool
+on every request. It is given the signing key up front, so it measures its best
+case, a warm SDK JWKS cache; every five minutes the SDK also refetched the JWKS
+inside a request. "after" is ClerkAuthenticator with a local JWKS server.
+
+    uv run python -m benchmarks.auth_middleware [requests] [concurrency]
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from clerk_backend_api import Clerk
+from clerk_backend_api.security import AuthenticateRequestOptions
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from starlette.requests import Request
+
+from auth import ClerkAuthenticator
+from concurrency import run_blocking
+
+SECRET_KEY = "sk_test_benchmark"
+KID = "ins_benchmark"
+
+
+def signing_key() -> tuple[rsa.RSAPrivateKey, str, dict]:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid=KID, use="sig", alg="RS256")
+    return private_key, pem, jwk
+
+
+def serve_jwks(jwk: dict) -> str:
+    body = json.dumps({"keys": [jwk]}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def make_request(token: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/history",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    })
+
+
+async def measure(name: str, authenticate, request: Request, total: int, concurrency: int) -> None:
+    for _ in range(20):
+        assert (await authenticate(request)).is_signed_in
+    latencies = []
+    for _ in range(total):
+        started = time.perf_counter()
+        await authenticate(request)
+        latencies.append(time.perf_counter() - started)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await authenticate(request)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(
+        f"{name:<7} p50={statistics.median(latencies) * 1e6:8.1f}us "
+        f"p99={latencies[int(len(latencies) * 0.99)] * 1e6:8.1f}us "
+        f"throughput@{concurrency}={total / elapsed:9.0f} req/s"
+    )
+
+
+async def main(total: int, concurrency: int) -> None:
+    private_key, pem, jwk = signing_key()
+    now = int(time.time())
+    token = jwt.encode(
+        {"sub": "user_benchmark", "sid": "sess_benchmark", "iat": now, "nbf": now, "exp": now + 3600},
+        private_key,
+        algorithm="RS256",
+        headers={"kid": KID},
+    )
+    request = make_request(token)
+    clerk = Clerk(bearer_auth=SECRET_KEY)
+
+    async def before(request):
+        return await run_blocking("clerk", clerk.authenticate_request, request, AuthenticateRequestOptions(jwt_key=pem))
+
+    authenticator = ClerkAuthenticator(SECRET_KEY, jwt_key=None)
+    authenticator.jwks.url = f"{serve_jwks(jwk)}/v1/jwks"
+
+    print(f"{total} requests, one user token")
+    await measure("before", before, request, total, concurrency)
+    await measure("after", authenticator.authenticate, request, total, concurrency)
+    print(f"after   {authenticator.report()}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(main(*(args + [2000, 64][len(args):])))
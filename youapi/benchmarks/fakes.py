@@ -0,0 +1,226 @@
+"""
+Local stand-ins for the services youapi calls, used by the load test.
+
+    uv run python -m benchmarks.fakes upstream --port 8701
+    uv run python -m benchmarks.fakes app --port 8700 --upstream http://127.0.0.1:8701
+
+"upstream" serves a fake YouTube (caption listings, timedtext XML and video
+metadata) and a fake OpenAI-compatible /v1/chat/completions that streams at a
+configurable token rate. "app" runs youapi's app with YouTube traffic routed to
+the fake, Convex replaced by an in-memory client and OpenAI pointed at the fake
+through OPENAI_BASE_URL. Clerk tokens are verified for real, against the key in
+CLERK_JWT_KEY, so no Clerk API is needed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from xml.sax.saxutils import escape
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+WORDS = "the quick brown fox jumps over a lazy dog while we learn about transformers attention and memory".split()
+
+
+def upstream_app(
+    youtube_latency: float = 0.05,
+    first_token_latency: float = 0.3,
+    tokens_per_second: float = 80,
+    completion_tokens: int = 200,
+    segments: int = 600,
+) -> Starlette:
+    async def info(request: Request):
+        await asyncio.sleep(youtube_latency)
+        video_id = request.path_params["video_id"]
+        return JSONResponse({
+            "title": f"Video {video_id}",
+            "author": "Benchmark Channel",
+            "thumbnail_url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+            "length": segments * 2,
+        })
+
+    async def captions(request: Request):
+        await asyncio.sleep(youtube_latency)
+        video_id = request.path_params["video_id"]
+        base = f"{str(request.base_url).rstrip('/')}/timedtext?v={video_id}"
+        return JSONResponse({
+            "translationLanguages": [
+                {"languageName": {"runs": [{"text": name}]}, "languageCode": code}
+                for code, name in [("vi", "Vietnamese"), ("fr", "French"), ("de", "German")]
+            ],
+            "captionTracks": [
+                {"baseUrl": f"{base}&lang=en", "name": {"runs": [{"text": "English"}]}, "languageCode": "en", "isTranslatable": True},
+                {"baseUrl": f"{base}&lang=es", "name": {"runs": [{"text": "Spanish"}]}, "languageCode": "es", "kind": "asr"},
+            ],
+        })
+
+    async def timedtext(request: Request):
+        await asyncio.sleep(youtube_latency)
+        language = request.query_params.get("tlang") or request.query_params.get("lang", "en")
+        lines = "".join(
+            f'<text start="{i * 2.0}" dur="2.0">{escape(" ".join(WORDS[(i + j) % len(WORDS)] for j in range(12)))} {language}</text>'
+            for i in range(segments)
+        )
+        return Response(f'<?xml version="1.0" encoding="utf-8" ?><transcript>{lines}</transcript>', media_type="text/xml")
+
+    def structured_output(response_format: dict) -> str:
+        properties = response_format.get("json_schema", {}).get("schema", {}).get("properties", {})
+        if "chapters" in properties:
+            return json.dumps({"chapters": [{"title": f"Chapter {i + 1}", "start": i * 120.0} for i in range(6)]})
+        if "questions" in properties:
+            return json.dumps({"questions": [f"What is point {i + 1}?" for i in range(4)]})
+        return "{}"
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+        tokens = [f"{WORDS[i % len(WORDS)]} " for i in range(completion_tokens)]
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_latency + completion_tokens / tokens_per_second)
+            response_format = body.get("response_format")
+            content = structured_output(response_format) if response_format else "".join(tokens)
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": completion_tokens, "total_tokens": completion_tokens},
+            })
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + "\n\n"
+
+        async def stream():
+            await asyncio.sleep(first_token_latency)
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                yield chunk({"content": token})
+                await asyncio.sleep(1 / tokens_per_second)
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    async def health(request: Request):
+        return JSONResponse({"ok": True})
+
+    return Starlette(routes=[
+        Route("/health", health),
+        Route("/info/{video_id}", info),
+        Route("/captions/{video_id}", captions),
+        Route("/timedtext", timedtext),
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+    ])
+
+
+class FakeConvex:
+    """In-memory summaryRequests with a fixed latency per call."""
+
+    def __init__(self, latency: float = 0.03):
+        self.latency = latency
+        self._rows: dict[str, dict[tuple, dict]] = {}
+        self._lock = threading.Lock()
+
+    def mutation(self, name: str, args: dict):
+        time.sleep(self.latency)
+        records = args["requests"] if name == "summaryRequests:upsertMany" else [args]
+        with self._lock:
+            for record in records:
+                rows = self._rows.setdefault(record["userId"], {})
+                key = (record["source"], record["videoId"])
+                row = rows.get(key) or {"_id": uuid.uuid4().hex, "_creationTime": time.time() * 1000}
+                row.update({k: v for k, v in record.items() if k != "apiKey"}, createdAt=time.time() * 1000)
+                rows[key] = row
+
+    def query(self, name: str, args: dict):
+        time.sleep(self.latency)
+        with self._lock:
+            rows = sorted(self._rows.get(args["userId"], {}).values(), key=lambda row: -row["_creationTime"])
+        options = args.get("paginationOpts")
+        if options is None:
+            return rows
+        start = int(options["cursor"] or 0)
+        end = start + options["numItems"]
+        return {"page": rows[start:end], "isDone": end >= len(rows), "continueCursor": str(end)}
+
+
+def install(upstream: str, convex_latency: float) -> None:
+    """Route the app's YouTube and Convex calls to the fakes."""
+    import main
+    import services
+    from concurrency import Lazy
+    from youtube_transcript_api import TranscriptList
+
+    class TranscriptApi:
+        def __init__(self, session):
+            self.session = session
+
+        def list(self, video_id: str) -> TranscriptList:
+            response = self.session.get(f"{upstream}/captions/{video_id}")
+            response.raise_for_status()
+            return TranscriptList.build(self.session, video_id, response.json())
+
+    def load_video_info(video_id: str, used=None):
+        def load(endpoint):
+            response = main.youtube_proxies.session(endpoint).get(f"{upstream}/info/{video_id}")
+            response.raise_for_status()
+            return main.VideoInfoResponse(video_id=video_id, **response.json())
+
+        return main.youtube_proxies.call(load, avoid=used)
+
+    main.transcript_api = lambda endpoint: TranscriptApi(main.youtube_proxies.session(endpoint))
+    main.load_video_info = load_video_info
+    fake_convex = Lazy(lambda: FakeConvex(convex_latency))
+    services.convex_client = fake_convex
+    services.history_writer.client = fake_convex
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("role", choices=["upstream", "app"])
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--upstream", default="http://127.0.0.1:8701")
+    parser.add_argument("--youtube-latency", type=float, default=0.05)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=80)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--segments", type=int, default=600)
+    parser.add_argument("--convex-latency", type=float, default=0.03)
+    args = parser.parse_args()
+
+    if args.role == "upstream":
+        app = upstream_app(
+            args.youtube_latency,
+            args.first_token_latency,
+            args.tokens_per_second,
+            args.completion_tokens,
+            args.segments,
+        )
+    else:
+        os.environ.setdefault("OPENAI_BASE_URL", f"{args.upstream}/v1")
+        os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+        install(args.upstream, args.convex_latency)
+        from main import app
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Offline load test of youapi against local fakes; no network access or API keys needed.
+
+Starts benchmarks.fakes (fake YouTube and OpenAI-compatible upstream) and the app
+in subprocesses, drives each scenario at a fixed concurrency for a fixed time and
+reports latency percentiles, time to first token for streamed responses, requests
+per second and the app's RSS. Results are saved as JSON so runs can be compared.
+
+    uv run python -m benchmarks.loadtest
+    uv run python -m benchmarks.loadtest --scenarios chat,mixed --concurrency 32 --label pooled
+    uv run python -m benchmarks.loadtest --compare results/a.json results/b.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import jwt
+
+from benchmarks.auth_middleware import KID, signing_key
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Request mix per scenario, as relative weights
+SCENARIOS = {
+    "info": {"info": 1},
+    "transcript": {"transcript": 1},
+    "summarize": {"summarize": 1},
+    "chat": {"chat": 1},
+    "chapters": {"chapters": 1},
+    "mixed": {"info": 4, "transcript": 3, "chat": 2, "summarize": 1, "chapters": 1},
+}
+
+
+@dataclass
+class Sample:
+    kind: str
+    latency: float
+    ttft: float | None
+    ok: bool
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float | None:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def summarize_samples(samples: list[Sample], elapsed: float) -> dict:
+    latencies = [s.latency * 1000 for s in samples if s.ok]
+    ttfts = [s.ttft * 1000 for s in samples if s.ok and s.ttft is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(not s.ok for s in samples),
+        "rps": len(samples) / elapsed if elapsed else 0,
+        "latency_ms": {f"p{p}": percentile(latencies, p) for p in (50, 95, 99)},
+        "ttft_ms": {f"p{p}": percentile(ttfts, p) for p in (50, 95, 99)} if ttfts else None,
+    }
+
+
+class Driver:
+    def __init__(self, base_url: str, tokens: list[str], videos: int, seed: int):
+        self.base_url = base_url
+        self.tokens = tokens
+        self.video_ids = [f"bench{i:06d}" for i in range(videos)]
+        self.rng = random.Random(seed)
+
+    async def request(self, client: httpx.AsyncClient, kind: str, worker: int) -> Sample:
+        video_id = self.rng.choice(self.video_ids)
+        headers = {"Authorization": f"Bearer {self.tokens[worker % len(self.tokens)]}"}
+        handle = f"{video_id}:en"
+        started = time.perf_counter()
+        ttft = None
+        try:
+            if kind == "info":
+                response = await client.get("/youtube/info", params={"video_id": video_id}, headers=headers)
+                ok = response.status_code == 200
+            elif kind == "transcript":
+                response = await client.get("/youtube/transcript", params={"video_id": video_id, "lang": "en"}, headers=headers)
+                ok = response.status_code == 200
+            elif kind == "chapters":
+                response = await client.post(
+                    "/youtube/generate-chapters",
+                    json={"video_id": video_id, "transcript_handle": handle},
+                    headers=headers,
+                )
+                ok = response.status_code == 200
+            else:
+                if kind == "summarize":
+                    path, body = "/summarize", {"video_id": video_id, "transcript_handle": handle}
+                else:
+                    question = f"What does the video say about point {self.rng.randrange(1000)}?"
+                    path = "/chat"
+                    body = {"video_id": video_id, "transcript_handle": handle, "messages": [{"role": "user", "content": question}]}
+                async with client.stream("POST", path, json=body, headers=headers) as response:
+                    ok = response.status_code == 200
+                    async for line in response.aiter_lines():
+                        if ttft is None and line.startswith("data: ") and line != "data: [DONE]":
+                            ttft = time.perf_counter() - started
+        except httpx.HTTPError:
+            ok = False
+        return Sample(kind, time.perf_counter() - started, ttft, ok)
+
+    async def run(self, name: str, mix: dict[str, int], concurrency: int, duration: float, app_pid: int) -> dict:
+        kinds = list(mix)
+        weights = [mix[kind] for kind in kinds]
+        samples: list[Sample] = []
+        rss = [rss_mb(app_pid)]
+        deadline = time.perf_counter() + duration
+
+        async def worker(index: int, client: httpx.AsyncClient):
+            while time.perf_counter() < deadline:
+                kind = self.rng.choices(kinds, weights)[0]
+                samples.append(await self.request(client, kind, index))
+
+        async def sample_rss():
+            while time.perf_counter() < deadline:
+                await asyncio.sleep(0.25)
+                rss.append(rss_mb(app_pid))
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=120) as client:
+            started = time.perf_counter()
+            await asyncio.gather(sample_rss(), *(worker(i, client) for i in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        result = summarize_samples(samples, elapsed)
+        result["concurrency"] = concurrency
+        known_rss = [value for value in rss if value is not None]
+        result["rss_mb"] = {"start": rss[0], "peak": max(known_rss, default=None), "end": rss_mb(app_pid)}
+        if len(kinds) > 1:
+            result["endpoints"] = {
+                kind: summarize_samples([s for s in samples if s.kind == kind], elapsed) for kind in kinds
+            }
+        return result
+
+
+def start(args: list[str], env: dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fakes", *args],
+        cwd=Path(__file__).parent.parent,
+        env=env,
+    )
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start in {timeout:.0f}s")
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(name: str, result: dict) -> None:
+    latency = result["latency_ms"]
+    ttft = result["ttft_ms"] or {}
+    rss = result["rss_mb"]
+
+    def ms(value):
+        return f"{value:8.1f}" if value is not None else "       -"
+
+    print(
+        f"{name:<11} rps={result['rps']:7.1f} err={result['errors']:<4d}"
+        f" p50={ms(latency['p50'])} p95={ms(latency['p95'])} p99={ms(latency['p99'])}"
+        f" ttft50={ms(ttft.get('p50'))} ttft95={ms(ttft.get('p95'))}"
+        f" rss_peak={rss['peak'] or 0:6.1f}MB"
+    )
+
+
+def compare(old_path: str, new_path: str) -> None:
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"{old.get('label') or old_path} ({old.get('revision')}) -> {new.get('label') or new_path} ({new.get('revision')})")
+    metrics = [
+        ("rps", lambda r: r["rps"]),
+        ("p50 ms", lambda r: r["latency_ms"]["p50"]),
+        ("p95 ms", lambda r: r["latency_ms"]["p95"]),
+        ("p99 ms", lambda r: r["latency_ms"]["p99"]),
+        ("ttft p50 ms", lambda r: (r["ttft_ms"] or {}).get("p50")),
+        ("ttft p95 ms", lambda r: (r["ttft_ms"] or {}).get("p95")),
+        ("rss peak MB", lambda r: r["rss_mb"]["peak"]),
+    ]
+    for name in new["scenarios"]:
+        if name not in old["scenarios"]:
+            continue
+        print(name)
+        for label, metric in metrics:
+            before, after = metric(old["scenarios"][name]), metric(new["scenarios"][name])
+            if before is None or after is None:
+                continue
+            change = f"{(after - before) / before * 100:+.1f}%" if before else ""
+            print(f"  {label:<12} {before:10.1f} -> {after:10.1f} {change}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    private_key, pem, _ = signing_key()
+    now = int(time.time())
+    tokens = [
+        jwt.encode(
+            {"sub": f"user_bench_{i}", "sid": f"sess_bench_{i}", "iat": now, "nbf": now, "exp": now + 24 * 3600},
+            private_key,
+            algorithm="RS256",
+            headers={"kid": KID},
+        )
+        for i in range(args.users)
+    ]
+
+    upstream_port, app_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    env = {
+        **os.environ,
+        "CLERK_JWT_KEY": pem,
+        "CLERK_SECRET_KEY": "",
+        "CONVEX_URL": "",
+        "PROXY_URLS": "",
+        "WEBSHARE_PROXY_USERNAME": "",
+        "CACHE_DISK_ENABLED": "false",
+        "OPENAI_BASE_URL": f"{upstream_url}/v1",
+        "OPENAI_API_KEY": "sk-benchmark",
+    }
+    fake_args = [
+        "--youtube-latency", str(args.youtube_latency),
+        "--first-token-latency", str(args.first_token_latency),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--completion-tokens", str(args.completion_tokens),
+        "--segments", str(args.segments),
+        "--convex-latency", str(args.convex_latency),
+    ]
+    upstream = start(["upstream", "--port", str(upstream_port), *fake_args], env)
+    app = start(["app", "--port", str(app_port), "--upstream", upstream_url, *fake_args], env)
+    try:
+        wait_ready(f"{upstream_url}/health", upstream)
+        wait_ready(f"http://127.0.0.1:{app_port}/", app)
+
+        driver = Driver(f"http://127.0.0.1:{app_port}", tokens, args.videos, args.seed)
+        results = {}
+        for name in args.scenarios.split(","):
+            results[name] = await driver.run(name, SCENARIOS[name], args.concurrency, args.duration, app.pid)
+            print_result(name, results[name])
+    finally:
+        for process in (app, upstream):
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        "label": args.label,
+        "revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "scenarios": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}{'-' + args.label if args.label else ''}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"saved {output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated: " + ", ".join(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--videos", type=int, default=200, help="distinct video IDs to draw from")
+    parser.add_argument("--users", type=int, default=20, help="distinct signed-in users")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--youtube-latency", type=float, default=0.05)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=80)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--segments", type=int, default=600, help="transcript segments per video")
+    parser.add_argument("--convex-latency", type=float, default=0.03)
+    parser.add_argument("--label", default="", help="name for this run in saved results")
+    parser.add_argument("--output", help=f"result file (default: {RESULTS_DIR.name}/<time>-<label>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved results and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cold start of a youapi worker, each run in a fresh interpreter: how long
+`import main` takes, and how long until uvicorn answers its first request.
+
+    uv run python -m benchmarks.startup
+    uv run python -m benchmarks.startup --runs 10 --max-import 1.5 --max-ready 3
+    uv run python -m benchmarks.startup --warmup blocking
+
+Exits with status 1 when the median import or startup time is over its limit, or
+when importing main loads one of the modules that are meant to load on first use,
+so a cold start regression fails CI.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.loadtest import free_port
+
+APP_DIR = Path(__file__).parent.parent
+
+# Loaded on first use (see load_ai_sdk, load_pytubefix, ClerkAuthenticator and
+# services.convex_client); importing main must not pull them in
+LAZY_MODULES = ("ai_sdk", "openai", "pytubefix", "clerk_backend_api", "convex")
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}))
+"""
+
+
+def app_env(warmup: str) -> dict[str, str]:
+    # No JWKS fetch, Convex client or disk cache: only the worker's own startup is measured
+    return {
+        **os.environ,
+        "CLERK_SECRET_KEY": "",
+        "CONVEX_URL": "",
+        "CACHE_DISK_ENABLED": "false",
+        "WARMUP": warmup,
+    }
+
+
+def measure_import(env: dict[str, str]) -> tuple[float, list[str]]:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    eager = [name for name in LAZY_MODULES if name in result["modules"]]
+    return result["seconds"], eager
+
+
+def measure_ready(env: dict[str, str], timeout: float = 60) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR,
+        env=env,
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError(f"uvicorn did not answer within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", default="off", choices=["off", "background", "blocking"], help="WARMUP for the app")
+    parser.add_argument("--max-import", type=float, default=1.5, help="limit on the median import time, seconds")
+    parser.add_argument("--max-ready", type=float, default=3.0, help="limit on the median time to first response, seconds")
+    args = parser.parse_args()
+
+    env = app_env(args.warmup)
+    imports, readies, eager = [], [], set()
+    for _ in range(args.runs):
+        seconds, loaded = measure_import(env)
+        imports.append(seconds)
+        eager.update(loaded)
+        readies.append(measure_ready(env))
+
+    failures = []
+    for label, samples, limit in (("import main", imports, args.max_import), ("first response", readies, args.max_ready)):
+        median = statistics.median(samples)
+        print(f"{label:<15} median {median * 1000:7.0f}ms  min {min(samples) * 1000:7.0f}ms  limit {limit * 1000:7.0f}ms")
+        if median > limit:
+            failures.append(f"{label} took {median:.2f}s, over the {limit:.2f}s limit")
+    if eager:
+        failures.append(f"import main loaded {', '.join(sorted(eager))}, which should load on first use")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
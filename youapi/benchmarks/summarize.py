@@ -0,0 +1,152 @@
+"""
+/summarize on long transcripts, single pass against map-reduce, with a stub model.
+
+    uv run python -m benchmarks.summarize
+    uv run python -m benchmarks.summarize --hours 1,2,4 --prefill-rate 4000 --decode-rate 60
+
+Each transcript is summarized both ways through summarize_video: "single" with
+LONG_TRANSCRIPT_CHARS raised past its length, "map-reduce" with the configured
+chunk size and fan-out. The stub model takes prompt_tokens / prefill-rate seconds
+to its first token and then emits tokens at decode-rate, so a longer prompt means
+a later first token, as with a real provider. Reports time to the first SSE frame,
+total time, the largest prompt sent and whether it overflows --context-window.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from types import SimpleNamespace
+
+from fastapi import Request
+
+WORDS = (
+    "attention memory gradient token model layer training data loss optimizer batch "
+    "inference latency context window retrieval embedding transformer decoder encoder "
+    "benchmark podcast guest question answer research paper result experiment"
+).split()
+
+# Speech runs at about 150 words a minute, in captions of about 3 seconds
+SEGMENT_SECONDS = 3.0
+WORDS_PER_SEGMENT = 8
+
+
+def make_transcript(hours: float, seed: int):
+    from transcripts import CompactTranscript, SegmentView
+
+    rng = random.Random(seed)
+    segments = [
+        SegmentView(" ".join(rng.choices(WORDS, k=WORDS_PER_SEGMENT)), i * SEGMENT_SECONDS, SEGMENT_SECONDS)
+        for i in range(int(hours * 3600 / SEGMENT_SECONDS))
+    ]
+    return CompactTranscript.from_segments(f"bench{seed:06d}", "English", "en", False, segments)
+
+
+class StubModel:
+    """Latency model of an LLM provider: prefill proportional to the prompt, then decoding."""
+
+    def __init__(self, prefill_rate: float, decode_rate: float, notes_tokens: int, summary_tokens: int):
+        self.prefill_rate = prefill_rate
+        self.decode_rate = decode_rate
+        self.notes_tokens = notes_tokens
+        self.summary_tokens = summary_tokens
+        self.calls = 0
+        self.largest_prompt = 0
+
+    def _prefill(self, prompt: str) -> float:
+        from prompts import count_tokens
+
+        tokens = count_tokens(prompt)
+        self.calls += 1
+        self.largest_prompt = max(self.largest_prompt, tokens)
+        return tokens / self.prefill_rate
+
+    # ai_sdk surface used by the map step
+    def openai(self, model_name: str) -> str:
+        return model_name
+
+    def generate_text(self, *, model, prompt: str):
+        time.sleep(self._prefill(prompt) + self.notes_tokens / self.decode_rate)
+        return SimpleNamespace(text=" ".join(["note"] * self.notes_tokens))
+
+    # Replaces streaming.stream_completion for the single pass and the reduce step
+    async def stream_completion(self, model, *, prompt: str | None = None, messages=None):
+        await asyncio.sleep(self._prefill(prompt))
+        for _ in range(self.summary_tokens):
+            yield "word "
+            await asyncio.sleep(1 / self.decode_rate)
+
+
+async def measure(main, transcript) -> tuple[float, float]:
+    started = time.perf_counter()
+    response = await main.summarize_video(
+        main.SummarizeRequest(video_id=transcript.video_id, transcript_handle=transcript.transcript_handle),
+        Request({"type": "http"}),
+    )
+    first_frame = None
+    async for frame in response.body_iterator:
+        # Keep-alive comments are not content
+        if first_frame is None and frame.startswith("data:"):
+            first_frame = time.perf_counter() - started
+    return first_frame, time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    import main
+    from concurrency import Lazy
+
+    print(
+        f"stub model: prefill {args.prefill_rate:.0f} tok/s, decode {args.decode_rate:.0f} tok/s; "
+        f"chunks of {main.SUMMARY_CHUNK_CHARS} chars, fan-out {main.SUMMARY_MAP_CONCURRENCY}"
+    )
+    print(f"{'hours':>5} {'mode':<10} {'calls':>5} {'largest prompt':>15} {'first frame':>12} {'total':>8}")
+    seed = 0
+    for hours in args.hours:
+        for mode in ("single", "map-reduce"):
+            # A new transcript per run, so no chunk notes or summaries are cached
+            seed += 1
+            transcript = make_transcript(hours, seed)
+            main.cache_transcript(transcript)
+            stub = StubModel(args.prefill_rate, args.decode_rate, args.notes_tokens, args.summary_tokens)
+            main.ai_sdk = Lazy(lambda stub=stub: stub)
+            main.stream_completion = stub.stream_completion
+            main.LONG_TRANSCRIPT_CHARS = len(transcript.text) + 1 if mode == "single" else args.long_transcript_chars
+
+            first_frame, total = await measure(main, transcript)
+            overflow = "  overflows context" if stub.largest_prompt > args.context_window else ""
+            print(
+                f"{hours:>5g} {mode:<10} {stub.calls:>5} {stub.largest_prompt:>8} tokens "
+                f"{first_frame:>11.2f}s {total:>7.2f}s{overflow}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", default="0.5,2,4", help="transcript lengths, comma separated")
+    parser.add_argument("--prefill-rate", type=float, default=4000, help="prompt tokens per second")
+    parser.add_argument("--decode-rate", type=float, default=100, help="output tokens per second")
+    parser.add_argument("--notes-tokens", type=int, default=150, help="output tokens per chunk summary")
+    parser.add_argument("--summary-tokens", type=int, default=300, help="output tokens of the final summary")
+    parser.add_argument("--context-window", type=int, default=128000, help="model context window, tokens")
+    parser.add_argument("--long-transcript-chars", type=int, help="LONG_TRANSCRIPT_CHARS for map-reduce runs")
+    args = parser.parse_args()
+    args.hours = [float(hours) for hours in args.hours.split(",")]
+
+    # Settings are read when main is imported: no disk cache, auth, Convex or background jobs
+    os.environ.update(
+        CACHE_DISK_ENABLED="false",
+        CLERK_SECRET_KEY="",
+        CONVEX_URL="",
+        PRECOMPUTE_ENABLED="false",
+        METRICS_ENABLED="false",
+    )
+    if args.long_transcript_chars is None:
+        from main import LONG_TRANSCRIPT_CHARS
+
+        args.long_transcript_chars = LONG_TRANSCRIPT_CHARS
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
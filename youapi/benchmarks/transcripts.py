@@ -0,0 +1,138 @@
+"""
+CompactTranscript against the previous per-segment pydantic path, for one long transcript.
+
+    uv run python -m benchmarks.transcripts
+    uv run python -m benchmarks.transcripts --segments 10000 --runs 20
+
+"before" builds a TranscriptSegment model per snippet inside a TranscriptResponse,
+joins the texts for prompts, and serializes the response the way FastAPI does for
+response_model (dump, validate again, dump to JSON); its cache copy was the model's
+JSON. "after" is CompactTranscript with its direct JSON and binary cache encodings.
+Latencies are medians over --runs; memory is what tracemalloc sees retained after
+building, and the peak while building and serializing.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from pydantic import BaseModel
+from youtube_transcript_api import FetchedTranscriptSnippet
+
+from transcripts import CompactTranscript
+
+WORDS = "so the idea here is that we can take the model and look at what it does with memory and attention".split()
+
+
+class TranscriptSegment(BaseModel):
+    text: str
+    start: float
+    duration: float
+
+
+class TranscriptResponse(BaseModel):
+    video_id: str
+    language: str
+    language_code: str
+    is_generated: bool
+    segments: list[TranscriptSegment]
+
+
+def make_snippets(count: int) -> list[FetchedTranscriptSnippet]:
+    rng = random.Random(0)
+    return [
+        FetchedTranscriptSnippet(text=" ".join(rng.choices(WORDS, k=rng.randint(4, 12))), start=i * 2.5, duration=2.5)
+        for i in range(count)
+    ]
+
+
+def build_before(snippets: list[FetchedTranscriptSnippet]) -> TranscriptResponse:
+    return TranscriptResponse(
+        video_id="dQw4w9WgXcQ",
+        language="English",
+        language_code="en",
+        is_generated=True,
+        segments=[
+            TranscriptSegment(text=snippet.text, start=snippet.start, duration=snippet.duration)
+            for snippet in snippets
+        ],
+    )
+
+
+def build_after(snippets: list[FetchedTranscriptSnippet]) -> CompactTranscript:
+    return CompactTranscript.from_segments("dQw4w9WgXcQ", "English", "en", True, snippets)
+
+
+def respond_before(response: TranscriptResponse) -> bytes:
+    # What FastAPI did for response_model=TranscriptResponse
+    validated = TranscriptResponse.model_validate(response.model_dump())
+    return json.dumps(validated.model_dump(mode="json")).encode()
+
+
+def median_ms(fn: Callable[[], object], runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def memory(fn: Callable[[], object]) -> tuple[float, float]:
+    """MiB retained by fn's result and peak MiB while fn runs."""
+    tracemalloc.start()
+    result = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained / 2**20, peak / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    snippets = make_snippets(args.segments)
+    before = build_before(snippets)
+    after = build_after(snippets)
+    assert json.loads(respond_before(before))["segments"] == json.loads(after.to_json())["segments"]
+    old_cached = before.model_dump_json().encode()
+    new_cached = after.to_bytes()
+
+    rows = [
+        ("build", lambda: build_before(snippets), lambda: build_after(snippets)),
+        ("full text", lambda: " ".join(segment.text for segment in before.segments), lambda: after.text),
+        ("response JSON", lambda: respond_before(before), after.to_json),
+        ("cache encode", lambda: before.model_dump_json().encode(), after.to_bytes),
+        ("cache decode", lambda: TranscriptResponse.model_validate_json(old_cached), lambda: CompactTranscript.from_bytes(new_cached)),
+        (
+            "end to end",
+            lambda: respond_before(build_before(snippets)),
+            lambda: build_after(snippets).to_json(),
+        ),
+    ]
+
+    print(f"{args.segments} segments, median of {args.runs} runs")
+    print(f"{'':<15} {'before':>10} {'after':>10} {'speedup':>8}")
+    for name, old, new in rows:
+        old_ms, new_ms = median_ms(old, args.runs), median_ms(new, args.runs)
+        print(f"{name:<15} {old_ms:>8.2f}ms {new_ms:>8.2f}ms {old_ms / new_ms if new_ms else float('inf'):>7.1f}x")
+
+    old_retained, old_peak = memory(lambda: build_before(snippets))
+    new_retained, new_peak = memory(lambda: build_after(snippets))
+    _, old_respond_peak = memory(lambda: respond_before(build_before(snippets)))
+    _, new_respond_peak = memory(lambda: build_after(snippets).to_json())
+    print(f"{'retained':<15} {old_retained:>7.2f}MiB {new_retained:>7.2f}MiB")
+    print(f"{'build peak':<15} {old_peak:>7.2f}MiB {new_peak:>7.2f}MiB")
+    print(f"{'respond peak':<15} {old_respond_peak:>7.2f}MiB {new_respond_peak:>7.2f}MiB")
+    print(f"{'cached size':<15} {len(old_cached) / 2**20:>7.2f}MiB {len(new_cached) / 2**20:>7.2f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any, Generic, TypeVar
+
+from concurrency import run_blocking
+
+V = TypeVar("V")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a cache."""
+
+    hits: int = 0
+    misses: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    expired: int = 0
+    stale_hits: int = 0
+
+    def as_dict(self) -> dict[str, int | float]:
+        total = self.hits + self.misses
+        return {**asdict(self), "hit_rate": self.hits / total if total else 0.0}
+
+
+class LRUCache(Generic[V]):
+    """Thread-safe in-process LRU cache bounded by the total size of its entries."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[V, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: V, size: int) -> None:
+        if size > self.max_bytes:
+            return  # Never let a single entry flush the whole cache
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+
+
+class SQLiteStore:
+    """Persistent key/value table in SQLite with a per-entry TTL."""
+
+    def __init__(self, path: str, table: str, ttl: float):
+        self.table = table
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Endpoints run in a thread pool, so the connection is shared behind a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        """Return (value, expires_at), or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            return row[0], row[1]
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def update(self, key: str, change: Callable[[bytes | None], bytes | None], ttl: float | None = None) -> None:
+        """
+        Read, change and write back one entry in a single transaction.
+
+        BEGIN IMMEDIATE takes the write lock up front, so concurrent updates from
+        other threads or processes wait instead of overwriting each other. change
+        gets None for a missing or expired entry and returns None to leave it as is.
+        """
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+                value = change(row[0] if row is not None else None)
+                if value is not None:
+                    self._conn.execute(
+                        f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at),
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),)
+            )
+            return cursor.rowcount
+
+
+class TieredCache(Generic[V]):
+    """
+    Two-tier cache: an in-process LRU in front of an optional SQLite store.
+
+    Values are kept decoded in memory and encoded to bytes on disk. Disk hits are
+    promoted into the memory tier for the remainder of their TTL. With a stale_ttl,
+    expired entries are kept that much longer for get(key, allow_stale=True), to
+    serve while the upstream is down. Coroutines use aget(), aset() and adelete(),
+    which run disk I/O and decoding in the "cache" pool instead of on the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        encode: Callable[[V], bytes],
+        decode: Callable[[bytes], V],
+        max_bytes: int,
+        ttl: float,
+        store: SQLiteStore | None = None,
+        stale_ttl: float = 0,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = CacheStats()
+        self._encode = encode
+        self._decode = decode
+        self._memory: LRUCache[tuple[V, float]] = LRUCache(max_bytes)
+        self._store = store
+
+    def get(self, key: str, allow_stale: bool = False) -> V | None:
+        now = time.time()
+        found, value = self._get_memory(key, allow_stale, now)
+        if found:
+            return value
+        return self._get_store(key, allow_stale, now)
+
+    def in_memory(self, key: str) -> bool:
+        """Whether the memory tier holds an unexpired entry for key; not counted as a lookup."""
+        entry = self._memory.get(key)
+        return entry is not None and entry[1] > time.time()
+
+    async def aget(self, key: str, allow_stale: bool = False) -> V | None:
+        """get() for the event loop: memory hits are served inline, disk reads run in the "cache" pool."""
+        now = time.time()
+        found, value = self._get_memory(key, allow_stale, now)
+        if found:
+            return value
+        if self._store is None:
+            return self._get_store(key, allow_stale, now)  # Only counts the miss
+        return await run_blocking("cache", self._get_store, key, allow_stale, now)
+
+    def _get_memory(self, key: str, allow_stale: bool, now: float) -> tuple[bool, V | None]:
+        """(True, result) when the memory tier settles the lookup, else (False, None)."""
+        entry = self._memory.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at > now:
+            self.stats.hits += 1
+            self.stats.memory_hits += 1
+            return True, value
+        if expires_at + self.stale_ttl > now:
+            if allow_stale:
+                self.stats.stale_hits += 1
+                return True, value
+            self.stats.expired += 1
+            self.stats.misses += 1
+            return True, None
+        self._memory.delete(key)
+        self.stats.expired += 1
+        return False, None
+
+    def _get_store(self, key: str, allow_stale: bool, now: float) -> V | None:
+        if self._store is not None:
+            row = self._store.get(key)
+            if row is not None:
+                data, stale_until = row
+                expires_at = stale_until - self.stale_ttl
+                value = self._decode(data)
+                self._memory.set(key, (value, expires_at), len(data))
+                if expires_at > now:
+                    self.stats.hits += 1
+                    self.stats.disk_hits += 1
+                    return value
+                if allow_stale:
+                    self.stats.stale_hits += 1
+                    return value
+                self.stats.expired += 1
+
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: V, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        data = self._encode(value)
+        self._memory.set(key, (value, time.time() + ttl), len(data))
+        if self._store is not None:
+            self._store.set(key, data, ttl + self.stale_ttl)
+
+    async def aset(self, key: str, value: V, ttl: float | None = None) -> None:
+        """set() for the event loop: encoding and the disk write run in the "cache" pool."""
+        if self._store is None:
+            self.set(key, value, ttl)
+        else:
+            await run_blocking("cache", self.set, key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self._memory.delete(key)
+        if self._store is not None:
+            self._store.delete(key)
+
+    async def adelete(self, key: str) -> None:
+        self._memory.delete(key)
+        if self._store is not None:
+            await run_blocking("cache", self._store.delete, key)
+
+    def report(self) -> dict[str, Any]:
+        self.stats.evictions = self._memory.evictions
+        return {
+            **self.stats.as_dict(),
+            "entries": len(self._memory),
+            "bytes": self._memory.size,
+        }
+
+
+def content_key(*parts: str) -> str:
+    """Hash the inputs that fully determine a result into a cache key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Shared cache settings. Expired rows are only deleted when read, so every
+# CACHE_PURGE_INTERVAL seconds the rest are purged from every open store.
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", ".cache/youapi.sqlite3")
+CACHE_DISK_ENABLED = os.environ.get("CACHE_DISK_ENABLED", "true").lower() != "false"
+CACHE_PURGE_INTERVAL = float(os.environ.get("CACHE_PURGE_INTERVAL", 3600))
+
+_stores: list[SQLiteStore] = []
+
+
+def open_store(table: str, ttl: float) -> SQLiteStore | None:
+    """Open a table in the shared cache database, or None if disk caching is disabled."""
+    if not CACHE_DISK_ENABLED:
+        return None
+    store = SQLiteStore(CACHE_DB_PATH, table=table, ttl=ttl)
+    _stores.append(store)
+    return store
+
+
+def purge_expired_stores() -> int:
+    return sum(store.purge_expired() for store in _stores)
+
+
+async def run_purge(interval: float = CACHE_PURGE_INTERVAL) -> None:
+    """Purge expired rows from the open stores every interval seconds, until cancelled."""
+    while True:
+        try:
+            purged = await run_blocking("cache", purge_expired_stores)
+            if purged:
+                logger.info("Purged %d expired cache rows", purged)
+        except Exception:
+            logger.exception("Failed to purge expired cache rows")
+        await asyncio.sleep(interval)
@@ -0,0 +1,115 @@
+import asyncio
+import functools
+import os
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+# Dedicated thread pools for blocking SDK calls, one per upstream so a slow
+# upstream can only exhaust its own pool and never the event loop. The "index"
+# pool runs CPU-bound transcript work: retrieval index builds and compaction.
+# The "streams" pool holds one thread per open LLM stream, so it caps concurrent
+# generations. The "cache" pool runs SQLite reads and writes: cache tiers, purges and chat sessions.
+POOL_SIZES = {
+    "llm": int(os.environ.get("LLM_POOL_SIZE", 16)),
+    "streams": int(os.environ.get("STREAM_POOL_SIZE", 64)),
+    "youtube": int(os.environ.get("YOUTUBE_POOL_SIZE", 8)),
+    "transcripts": int(os.environ.get("TRANSCRIPTS_POOL_SIZE", 8)),
+    "convex": int(os.environ.get("CONVEX_POOL_SIZE", 4)),
+    "clerk": int(os.environ.get("CLERK_POOL_SIZE", 8)),
+    "index": int(os.environ.get("INDEX_POOL_SIZE", 2)),
+    "cache": int(os.environ.get("CACHE_POOL_SIZE", 4)),
+}
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+
+
+def get_executor(pool: str) -> ThreadPoolExecutor:
+    executor = _executors.get(pool)
+    if executor is None:
+        executor = _executors[pool] = ThreadPoolExecutor(
+            max_workers=POOL_SIZES[pool],
+            thread_name_prefix=f"{pool}-pool",
+        )
+    return executor
+
+
+async def run_blocking(pool: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking call in the named upstream pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(pool), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    for executor in _executors.values():
+        executor.shutdown(wait=wait)
+    _executors.clear()
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key.
+
+    The first caller for a key starts the call; callers arriving while it is in
+    flight await the same task and receive its result or exception. The task is
+    shielded, so a caller going away does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = self._in_flight[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def report(self) -> dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+
+
+class Lazy(Generic[T]):
+    """
+    A value built on first use, for SDKs that are slow to import and their clients.
+
+    The factory runs once, even when the event loop and pool threads ask at the
+    same time.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value: T | None = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> T:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._factory()
+                    self._loaded = True
+        return self._value
+
+    async def load(self, pool: str) -> T:
+        """get() for the event loop: the first build runs in the named pool instead."""
+        if self._loaded:
+            return self._value
+        return await run_blocking(pool, self.get)
@@ -0,0 +1,190 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from contextvars import ContextVar
+from typing import Any
+
+# With METRICS_ENABLED=false no stage is timed and the request middleware is not
+# installed; /metrics still reports the counters the app keeps anyway.
+# When METRICS_TOKEN is set, /metrics requires "Authorization: Bearer <token>".
+# Otherwise it requires a signed-in session like any other route, unless
+# METRICS_PUBLIC=true serves it to anyone (e.g. behind a private network).
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+METRICS_PUBLIC = os.environ.get("METRICS_PUBLIC", "false").lower() == "true"
+
+# Seconds, from sub-millisecond parsing up to full generations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RATE_BUCKETS = (5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+
+# Route of the request being served, so spans deep in the call stack are labelled with it
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="")
+
+# (labels, value) pairs of one metric family
+Samples = Iterable[tuple[dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...], buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label values: [count per bucket (+Inf last), sum]
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in series:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels({**base, 'le': bound})} {cumulative}"
+            yield f"{self.name}_sum{_labels(base)} {total}"
+            yield f"{self.name}_count{_labels(base)} {cumulative}"
+
+
+class Registry:
+    """Histograms observed in the request path, plus collectors read at scrape time."""
+
+    def __init__(self):
+        self.histograms: list[Histogram] = []
+        self.collectors: list[Callable[[], Iterable[tuple[str, str, str, Samples]]]] = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        histogram = Histogram(*args, **kwargs)
+        self.histograms.append(histogram)
+        return histogram
+
+    def collector(self, fn: Callable[[], Iterable[tuple[str, str, str, Samples]]]):
+        """Register fn, which yields (name, type, help, samples) for each metric family."""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for collect in self.collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_labels(labels)} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_seconds = registry.histogram(
+    "youapi_request_seconds",
+    "Time until the response starts, by route and status",
+    ("endpoint", "method", "status"),
+)
+stage_seconds = registry.histogram(
+    "youapi_stage_seconds",
+    "Time spent in each stage of a request",
+    ("endpoint", "stage"),
+)
+llm_time_to_first_token = registry.histogram(
+    "youapi_llm_time_to_first_token_seconds",
+    "Time from sending a streamed completion request to its first token",
+    ("endpoint", "model"),
+)
+llm_tokens_per_second = registry.histogram(
+    "youapi_llm_tokens_per_second",
+    "Streamed completion deltas per second after the first one",
+    ("endpoint", "model"),
+    RATE_BUCKETS,
+)
+
+
+class _Span:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        stage_seconds.observe(time.perf_counter() - self.started, current_endpoint.get(), self.stage)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage: str) -> _Span | _NoSpan:
+    """Time a block as one stage of the current request."""
+    return _Span(stage) if METRICS_ENABLED else _NO_SPAN
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        stage_seconds.observe(seconds, current_endpoint.get(), stage)
+
+
+def timed(stage: str):
+    """Time every call of the decorated function as a stage; a no-op when disabled."""
+
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Span(stage):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,172 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from metrics import current_endpoint
+
+logger = logging.getLogger(__name__)
+
+# Once PRECOMPUTE_MIN_USERS different users have requested a video's English
+# transcript within PRECOMPUTE_WINDOW seconds, its default summaries, chapters and
+# questions are generated in the background by PRECOMPUTE_WORKERS workers, so the
+# endpoints find them stored. One user's requests never make a video popular.
+PRECOMPUTE_ENABLED = os.environ.get("PRECOMPUTE_ENABLED", "true").lower() == "true"
+PRECOMPUTE_MIN_USERS = int(os.environ.get("PRECOMPUTE_MIN_USERS", 5))
+PRECOMPUTE_WINDOW = float(os.environ.get("PRECOMPUTE_WINDOW", 6 * 3600))
+PRECOMPUTE_WORKERS = int(os.environ.get("PRECOMPUTE_WORKERS", 2))
+PRECOMPUTE_MAX_QUEUED = int(os.environ.get("PRECOMPUTE_MAX_QUEUED", 1000))
+# Videos whose requests are counted, and finished jobs remembered for dedupe
+PRECOMPUTE_MAX_TRACKED = int(os.environ.get("PRECOMPUTE_MAX_TRACKED", 10000))
+# Users remembered per video; counts stop there
+PRECOMPUTE_MAX_USERS = int(os.environ.get("PRECOMPUTE_MAX_USERS", 64))
+
+
+class UserCounter:
+    """Distinct users per key within a time window, for the most recently requested keys."""
+
+    def __init__(
+        self,
+        window: float = PRECOMPUTE_WINDOW,
+        max_keys: int = PRECOMPUTE_MAX_TRACKED,
+        max_users: int = PRECOMPUTE_MAX_USERS,
+    ):
+        self.window = window
+        self.max_keys = max_keys
+        self.max_users = max_users
+        # When each user last requested each key, oldest first at both levels
+        self._users: OrderedDict[Hashable, OrderedDict[Hashable, float]] = OrderedDict()
+
+    def add(self, key: Hashable, user: Hashable) -> int:
+        """Record a request by user; the number of users who requested key within the window."""
+        now = time.monotonic()
+        users = self._users.pop(key, None) or OrderedDict()
+        self._users[key] = users
+        users.pop(user, None)
+        users[user] = now
+        cutoff = now - self.window
+        while next(iter(users.values())) < cutoff:
+            users.popitem(last=False)
+        if len(users) > self.max_users:
+            users.popitem(last=False)
+        if len(self._users) > self.max_keys:
+            self._users.popitem(last=False)
+        return len(users)
+
+
+class PrecomputeQueue:
+    """
+    Background jobs run by a fixed pool of workers, lowest priority value first.
+
+    Jobs are keyed by the artifact they produce, and each returns whether it had to
+    compute it (False when it was already stored) and the key it is stored under.
+    Submitting a key that is queued, running or recently done does nothing, except
+    that a queued job moves up when submitted again with a more urgent priority,
+    and a done job runs again once is_stored() says its artifact was evicted.
+    """
+
+    def __init__(
+        self,
+        workers: int = PRECOMPUTE_WORKERS,
+        max_queued: int = PRECOMPUTE_MAX_QUEUED,
+        max_done: int = PRECOMPUTE_MAX_TRACKED,
+        is_stored: Callable[[Hashable], bool] = lambda stored_key: True,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_done = max_done
+        self.is_stored = is_stored
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        # Priority and sequence number of each key's current entry; older entries
+        # of a promoted key stay in the heap and are skipped
+        self._queued: dict[Hashable, tuple[Any, int]] = {}
+        self._running: set[Hashable] = set()
+        # Key each done job stored its artifact under
+        self._done: OrderedDict[Hashable, Hashable] = OrderedDict()
+        self._sequence = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        self.submitted = 0
+        self.duplicates = 0
+        self.promoted = 0
+        self.dropped = 0
+        self.computed = 0
+        self.already_stored = 0
+        self.failed = 0
+
+    def submit(
+        self, key: Hashable, priority: Any, fn: Callable[[], Awaitable[tuple[bool, Hashable]]]
+    ) -> bool:
+        """Queue fn() under key; False if the key is already handled or the queue is full."""
+        if key in self._done and not self.is_stored(self._done[key]):
+            del self._done[key]
+        if key in self._running or key in self._done:
+            self.duplicates += 1
+            return False
+        queued = self._queued.get(key)
+        if queued is not None:
+            if priority >= queued[0]:
+                self.duplicates += 1
+                return False
+            self.promoted += 1
+        elif len(self._queued) >= self.max_queued:
+            self.dropped += 1
+            return False
+        else:
+            self.submitted += 1
+        sequence = next(self._sequence)
+        self._queued[key] = (priority, sequence)
+        self._queue.put_nowait((priority, sequence, key, fn))
+        return True
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """Stop the workers; queued jobs are dropped, since they are only a head start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        current_endpoint.set("precompute")
+        while True:
+            _, sequence, key, fn = await self._queue.get()
+            if self._queued.get(key, (None, None))[1] != sequence:
+                continue  # Superseded by a more urgent entry
+            del self._queued[key]
+            self._running.add(key)
+            try:
+                computed, stored_key = await fn()
+            except Exception:
+                # Not remembered as done, so the next submit retries it
+                self.failed += 1
+                logger.warning("Precompute job %s failed", key, exc_info=True)
+            else:
+                if computed:
+                    self.computed += 1
+                else:
+                    self.already_stored += 1
+                self._done[key] = stored_key
+                if len(self._done) > self.max_done:
+                    self._done.popitem(last=False)
+            finally:
+                self._running.discard(key)
+
+    def report(self) -> dict[str, int]:
+        return {
+            "queued": len(self._queued),
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "duplicates": self.duplicates,
+            "promoted": self.promoted,
+            "dropped": self.dropped,
+            "computed": self.computed,
+            "already_stored": self.already_stored,
+            "failed": self.failed,
+        }
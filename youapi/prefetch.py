@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# At most PREFETCH_CONCURRENCY prefetches run at once; beyond that new ones are
+# dropped, not queued, so real requests always keep the rest of the upstream pools.
+# A prefetch counts as used when a request for its key comes within PREFETCH_TTL.
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_CONCURRENCY = int(os.environ.get("PREFETCH_CONCURRENCY", 2))
+PREFETCH_TTL = float(os.environ.get("PREFETCH_TTL", 300))
+PREFETCH_MAX_TRACKED = int(os.environ.get("PREFETCH_MAX_TRACKED", 10000))
+
+
+class Prefetcher:
+    """
+    Best-effort background fetches for the request that usually comes next.
+
+    schedule() starts the work only if nothing for the key was scheduled within the
+    TTL and a slot of the budget is free. Requests call claim() with the same key,
+    which is how the report tells used prefetches from wasted ones.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = PREFETCH_CONCURRENCY,
+        ttl: float = PREFETCH_TTL,
+        max_tracked: int = PREFETCH_MAX_TRACKED,
+    ):
+        self.max_concurrent = max_concurrent
+        self.ttl = ttl
+        self.max_tracked = max_tracked
+        self._tasks: set[asyncio.Task] = set()
+        # Scheduled and not yet claimed, by key, oldest first
+        self._pending: OrderedDict[Hashable, float] = OrderedDict()
+        self.scheduled = 0
+        self.duplicates = 0
+        self.over_budget = 0
+        self.completed = 0
+        self.failed = 0
+        self.used = 0
+        self.unused = 0
+
+    def schedule(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> bool:
+        """Start fn() in the background; False if it was skipped."""
+        self._expire()
+        if key in self._pending:
+            self.duplicates += 1
+            return False
+        if len(self._tasks) >= self.max_concurrent:
+            self.over_budget += 1
+            return False
+        self._pending[key] = time.monotonic()
+        if len(self._pending) > self.max_tracked:
+            self._pending.popitem(last=False)
+            self.unused += 1
+        self.scheduled += 1
+        task = asyncio.create_task(self._run(key, fn))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await fn()
+        except Exception:
+            # Nothing was stored, so a later request gets no benefit from it
+            self.failed += 1
+            self._pending.pop(key, None)
+            logger.debug("Prefetch of %s failed", key, exc_info=True)
+        else:
+            self.completed += 1
+
+    def claim(self, key: Hashable) -> None:
+        """A request needs what key prefetched, or is still prefetching."""
+        if key in self._pending:
+            if time.monotonic() - self._pending.pop(key) <= self.ttl:
+                self.used += 1
+            else:
+                self.unused += 1
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self._pending and next(iter(self._pending.values())) < cutoff:
+            self._pending.popitem(last=False)
+            self.unused += 1
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def report(self) -> dict[str, Any]:
+        self._expire()
+        return {
+            "scheduled": self.scheduled,
+            "in_flight": len(self._tasks),
+            "duplicates": self.duplicates,
+            "over_budget": self.over_budget,
+            "completed": self.completed,
+            "failed": self.failed,
+            "used": self.used,
+            "unused": self.unused,
+            "use_rate": self.used / (self.used + self.unused) if self.used + self.unused else None,
+        }
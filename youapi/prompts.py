@@ -0,0 +1,182 @@
+import logging
+import math
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class Segment(Protocol):
+    text: str
+    start: float
+    duration: float
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as H:MM:SS, or M:SS for times under an hour."""
+    total = int(seconds)
+    hours, remainder = divmod(total, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def chunk_segments(segments: Iterable[Segment], max_chars: int) -> list[str]:
+    """
+    Split transcript segments into text chunks of at most max_chars.
+
+    Chunks only break between segments and are labeled with the time range they
+    cover, e.g. "[12:30 - 25:04]".
+    """
+    chunks = []
+    current: list[str] = []
+    size = 0
+    chunk_start = chunk_end = 0.0
+
+    for segment in segments:
+        if current and size + len(segment.text) + 1 > max_chars:
+            chunks.append(_label_chunk(chunk_start, chunk_end, current))
+            current, size = [], 0
+        if not current:
+            chunk_start = segment.start
+        current.append(segment.text)
+        size += len(segment.text) + 1
+        chunk_end = segment.start + segment.duration
+
+    if current:
+        chunks.append(_label_chunk(chunk_start, chunk_end, current))
+    return chunks
+
+
+def chunk_text(text: str, max_chars: int) -> list[str]:
+    """Split plain transcript text into chunks of at most max_chars on word boundaries."""
+    chunks = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def _label_chunk(start: float, end: float, texts: list[str]) -> str:
+    return f"[{format_timestamp(start)} - {format_timestamp(end)}] " + " ".join(texts)
+
+
+@dataclass
+class Window:
+    """A contiguous slice of a transcript, with its time range when known."""
+
+    text: str
+    start: float | None = None
+    end: float | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or 0.0) - (self.start or 0.0)
+
+    def render(self) -> str:
+        if self.start is None or self.end is None:
+            return self.text
+        return f"[{format_timestamp(self.start)} - {format_timestamp(self.end)}] {self.text}"
+
+
+def windows_from_segments(segments: Iterable[Segment], window_seconds: float, rolling: bool = False) -> list[Window]:
+    """
+    Group consecutive segments into windows spanning about window_seconds each.
+
+    Auto-generated captions roll: each line repeats the tail of the previous one,
+    and some lines are repeated outright. With rolling, those repeated words are
+    dropped; manual captions are kept word for word, repeats included.
+    """
+    windows = []
+    words: list[str] = []
+    previous: list[str] = []
+    start = end = 0.0
+    for segment in segments:
+        if words and segment.start - start >= window_seconds:
+            windows.append(Window(" ".join(words), start, end))
+            words = []
+        current = segment.text.split()
+        overlap = _overlap(previous, current) if rolling else 0
+        previous = current
+        if overlap == len(current):
+            continue
+        if not words:
+            start = segment.start
+        words.extend(current[overlap:])
+        end = segment.start + segment.duration
+    if words:
+        windows.append(Window(" ".join(words), start, end))
+    return windows
+
+
+def windows_from_text(text: str, window_chars: int) -> list[Window]:
+    return [Window(chunk) for chunk in chunk_text(text, window_chars)]
+
+
+def _overlap(previous: list[str], current: list[str], limit: int = 12) -> int:
+    """Length of the longest tail of previous that current starts with."""
+    for size in range(min(len(previous), len(current), limit), 0, -1):
+        if previous[-size:] == current[:size]:
+            return size
+    return 0
+
+
+# Local token estimate: about 4 characters per token for words, one per
+# punctuation mark or CJK character, in line with OpenAI's BPE vocabularies
+TOKEN_PIECES = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]|[^\W\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in text."""
+    return sum(math.ceil(len(piece) / 4) for piece in TOKEN_PIECES.findall(text))
+
+
+def fit_to_budget(lines: list[str], budget: int) -> list[str]:
+    """Keep lines spread evenly across the whole list so they fit in budget tokens."""
+    counts = [count_tokens(line) for line in lines]
+    total = sum(counts)
+    if total <= budget:
+        return lines
+
+    keep = max(1, len(lines) * budget // total)
+    while True:
+        picked = [i * len(lines) // keep for i in range(keep)]
+        if keep == 1 or sum(counts[i] for i in picked) <= budget:
+            return [lines[i] for i in picked]
+        keep -= max(1, keep // 20)
+
+
+def budget_transcript(
+    name: str,
+    transcript_text: str | Callable[[], str],
+    windows: list[Window],
+    budget: int | None = None,
+    render: Callable[[Window], str] = lambda window: window.text,
+    separator: str = "\n",
+) -> str:
+    """
+    Render compacted transcript windows for a prompt, sampled down to a token budget.
+
+    transcript_text is only used to log the savings, so it may be a function that
+    builds it when INFO logging is on.
+    """
+    lines = [render(window) for window in windows]
+    if budget is not None:
+        lines = fit_to_budget(lines, budget)
+    context = separator.join(lines)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "%s prompt transcript tokens: %d -> %d",
+            name,
+            count_tokens(transcript_text() if callable(transcript_text) else transcript_text),
+            count_tokens(context),
+        )
+    return context
@@ -0,0 +1,291 @@
+import json
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+from urllib.error import HTTPError
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError
+
+T = TypeVar("T")
+
+# Every request gets HTTP_TIMEOUT seconds unless the caller sets its own, so a
+# stuck proxy exit fails instead of holding a worker thread forever
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 15))
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 4))
+
+# An endpoint is ejected after PROXY_EJECT_FAILURES consecutive failures or when
+# its average latency passes PROXY_EJECT_LATENCY seconds. It stays out for
+# PROXY_EJECT_SECONDS, doubling on every further ejection up to PROXY_EJECT_MAX_SECONDS.
+PROXY_EJECT_FAILURES = int(os.environ.get("PROXY_EJECT_FAILURES", 3))
+PROXY_EJECT_LATENCY = float(os.environ.get("PROXY_EJECT_LATENCY", 8))
+PROXY_EJECT_SECONDS = float(os.environ.get("PROXY_EJECT_SECONDS", 30))
+PROXY_EJECT_MAX_SECONDS = float(os.environ.get("PROXY_EJECT_MAX_SECONDS", 600))
+PROXY_RETRIES = int(os.environ.get("PROXY_RETRIES", 3))
+# Errors from the proxy or the path through it, as opposed to answers from the
+# upstream; the HTTP statuses are the proxy refusing us and the upstream's rate limit
+NETWORK_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    ProtocolError,
+    ConnectionError,
+    TimeoutError,
+)
+PROXY_FAILURE_STATUSES = frozenset({407, 429})
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.3
+
+
+def http_status(exc: BaseException) -> int | None:
+    """The status of an HTTP error response from urllib or requests."""
+    if isinstance(exc, HTTPError):
+        return exc.code
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code
+    return None
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=HTTP_TIMEOUT if timeout is None else timeout, **kwargs)
+
+
+class ProxyEndpoint:
+    """Health and latency of one proxy exit (or of direct connections when url is None)."""
+
+    def __init__(self, url: str | None):
+        self.url = url
+        self.latency: float | None = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        # Bumped to drop pooled connections, e.g. to get a new exit from a rotating proxy
+        self.generation = 0
+
+    @property
+    def name(self) -> str:
+        if self.url is None:
+            return "direct"
+        # Hide credentials in reports
+        return self.url.rpartition("@")[2]
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def report(self, now: float) -> dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "healthy": self.healthy(now),
+        }
+
+
+class ProxyPool:
+    """
+    Keep-alive HTTP sessions over a set of proxy endpoints.
+
+    Each call picks the faster of two random healthy endpoints. Network errors,
+    407 and 429 responses and the given failure_types count against an endpoint;
+    slow or failing endpoints are ejected for a while and the call is retried on
+    another one. An endpoint with nothing healthy to replace it only has its
+    connections dropped, which gets a rotating proxy a new exit. Without keep_alive
+    every request asks for its connection to be closed, for rotating proxies that
+    pick the exit per connection. Sessions are per thread, since the libraries
+    using them are not thread-safe.
+    """
+
+    def __init__(
+        self,
+        urls: list[str | None],
+        failure_types: tuple[type[BaseException], ...] = (),
+        keep_alive: bool = True,
+        retries: int = PROXY_RETRIES,
+    ):
+        self.endpoints = [ProxyEndpoint(url) for url in urls or [None]]
+        self.failure_types = failure_types
+        self.keep_alive = keep_alive
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def choose(self, exclude: list[ProxyEndpoint] | None = None) -> ProxyEndpoint:
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e.healthy(now) and e not in (exclude or ())]
+        if not candidates:
+            # Nothing healthy left: use the endpoint that is due back first
+            candidates = [e for e in self.endpoints if e not in (exclude or ())] or self.endpoints
+            return min(candidates, key=lambda e: e.ejected_until)
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        # Untried endpoints go first so every endpoint gets a latency sample
+        return min(first, second, key=lambda e: -1.0 if e.latency is None else e.latency)
+
+    def is_failure(self, exc: BaseException) -> bool:
+        """Whether exc is the endpoint's fault rather than an answer from the upstream."""
+        return (
+            isinstance(exc, (*NETWORK_ERRORS, *self.failure_types))
+            or http_status(exc) in PROXY_FAILURE_STATUSES
+        )
+
+    def record(self, endpoint: ProxyEndpoint, latency: float, ok: bool) -> None:
+        with self._lock:
+            endpoint.requests += 1
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += LATENCY_ALPHA * (latency - endpoint.latency)
+            if ok:
+                endpoint.consecutive_failures = 0
+            else:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                endpoint.generation += 1
+            if endpoint.consecutive_failures >= PROXY_EJECT_FAILURES or endpoint.latency > PROXY_EJECT_LATENCY:
+                now = time.monotonic()
+                if any(other is not endpoint and other.healthy(now) for other in self.endpoints):
+                    self._eject(endpoint, now)
+                else:
+                    self._reset(endpoint)
+
+    def _eject(self, endpoint: ProxyEndpoint, now: float) -> None:
+        cooldown = min(PROXY_EJECT_SECONDS * 2 ** endpoint.ejections, PROXY_EJECT_MAX_SECONDS)
+        endpoint.ejections += 1
+        endpoint.ejected_until = now + cooldown
+        self._reset(endpoint)
+
+    def _reset(self, endpoint: ProxyEndpoint) -> None:
+        endpoint.consecutive_failures = 0
+        endpoint.generation += 1
+        # Start afresh, so one slow spell does not eject it again
+        endpoint.latency = None
+
+    def session(self, endpoint: ProxyEndpoint) -> requests.Session:
+        """This thread's keep-alive session through endpoint."""
+        sessions = self._local.__dict__.setdefault("sessions", {})
+        generation, session = sessions.get(id(endpoint), (None, None))
+        if session is None or generation != endpoint.generation:
+            if session is not None:
+                session.close()
+            session = requests.Session()
+            adapter = TimeoutHTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if endpoint.url is not None:
+                session.proxies = {"http": endpoint.url, "https": endpoint.url}
+            if not self.keep_alive:
+                session.headers["Connection"] = "close"
+            sessions[id(endpoint)] = (endpoint.generation, session)
+        return session
+
+    def current(self) -> ProxyEndpoint:
+        """The endpoint of the call running on this thread, or a fresh pick."""
+        return getattr(self._local, "endpoint", None) or self.choose()
+
+    def call(
+        self,
+        fn: Callable[[ProxyEndpoint], T],
+        retries: int | None = None,
+        avoid: list[ProxyEndpoint] | None = None,
+    ) -> T:
+        """
+        Run fn through a chosen endpoint, retrying proxy failures on other endpoints.
+
+        Endpoints in avoid are only used when nothing else is left; the endpoints
+        this call uses are added to it.
+        """
+        retries = self.retries if retries is None else retries
+        avoid = [] if avoid is None else avoid
+        failures = 0
+        while True:
+            endpoint = self.choose(avoid)
+            avoid.append(endpoint)
+            self._local.endpoint = endpoint
+            started = time.perf_counter()
+            try:
+                result = fn(endpoint)
+            except Exception as exc:
+                if not self.is_failure(exc):
+                    # The upstream answered, e.g. with "transcripts disabled"
+                    self.record(endpoint, time.perf_counter() - started, ok=True)
+                    raise
+                self.record(endpoint, time.perf_counter() - started, ok=False)
+                failures += 1
+                if failures > retries:
+                    raise
+                continue
+            finally:
+                self._local.endpoint = None
+            self.record(endpoint, time.perf_counter() - started, ok=True)
+            return result
+
+    def report(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {endpoint.name: endpoint.report(now) for endpoint in self.endpoints}
+
+
+class PooledResponse:
+    """The parts of urllib's response object that pytubefix reads."""
+
+    def __init__(self, response: requests.Response):
+        self._response = response
+        self.status = response.status_code
+        self.headers = response.headers
+
+    def read(self, amt: int | None = None) -> bytes:
+        if amt is None:
+            data = self._response.content
+            self._response.close()
+            return data
+        data = self._response.raw.read(amt, decode_content=True)
+        if not data:
+            self._response.close()
+        return data
+
+    def info(self):
+        return self.headers
+
+
+def install_pytubefix_transport(pool: ProxyPool) -> None:
+    """
+    Route pytubefix through the pool.
+
+    pytubefix opens a new urllib connection per request and sets proxies through a
+    process-wide opener; its single request function is swapped for one that uses
+    the pool's keep-alive sessions.
+    """
+    from pytubefix import request as pytubefix_request
+
+    def execute_request(url, method=None, headers=None, data=None, timeout=None):
+        base_headers = {"User-Agent": "Mozilla/5.0", "accept-language": "en-US,en"}
+        if headers:
+            base_headers.update(headers)
+        if data is not None and not isinstance(data, bytes):
+            data = json.dumps(data).encode()
+        if not url.lower().startswith("http"):
+            raise ValueError("Invalid URL")
+        if not isinstance(timeout, (int, float)):
+            timeout = None  # urllib's "global default" sentinel
+        response = pool.session(pool.current()).request(
+            method or ("POST" if data is not None else "GET"),
+            url,
+            headers=base_headers,
+            data=data,
+            timeout=timeout,
+            stream=True,
+        )
+        if response.status_code >= 400:
+            response.close()
+            raise HTTPError(url, response.status_code, response.reason, response.headers, None)
+        return PooledResponse(response)
+
+    pytubefix_request._execute_request = execute_request
@@ -0,0 +1,216 @@
+import asyncio
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from concurrency import run_blocking
+from metrics import span
+
+T = TypeVar("T")
+
+# A second attempt starts once the first has run longer than HEDGE_PERCENTILE of
+# recent successful calls (HEDGE_DEFAULT_DELAY until HEDGE_MIN_SAMPLES are in)
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 95))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", 0.25))
+HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", 3))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", 20))
+HEDGE_WINDOW = int(os.environ.get("HEDGE_WINDOW", 200))
+
+# The circuit opens after BREAKER_FAILURES consecutive failures and lets one trial
+# call through every BREAKER_RESET_SECONDS
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", 5))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", 30))
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed, open or half-open; in half-open a single trial call decides."""
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+        self._trial_running = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        if self.state == "open" and self.retry_after() == 0:
+            self.state = "half_open"
+        if self.state == "closed" or (self.state == "half_open" and not self._trial_running):
+            self._trial_running = self.state == "half_open"
+            return
+        self.rejected += 1
+        raise CircuitOpenError(self.name, self.retry_after() or self.reset_seconds)
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_running = False
+
+    def release(self) -> None:
+        """The call ended without telling anything about the upstream."""
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyTracker:
+    """Recent call latencies, for percentile-based hedging delays."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def hedge_delay(self) -> float:
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, self.percentile(HEDGE_PERCENTILE))
+
+
+def _discard_result(task: asyncio.Future) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+class Upstream:
+    """
+    Blocking calls to one flaky upstream: hedged, behind a circuit breaker.
+
+    fn receives a list shared by all attempts of one call, in which each attempt
+    records the proxy endpoints it used, so the hedge goes through a different
+    one. Exceptions in answers (e.g. "transcripts disabled") mean the upstream
+    is healthy and are raised right away without hedging, unless they are also
+    in blocked.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool: str,
+        answers: tuple[type[BaseException], ...] = (),
+        blocked: tuple[type[BaseException], ...] = (),
+    ):
+        self.name = name
+        self.pool = pool
+        self.answers = answers
+        self.blocked = blocked
+        self.breaker = CircuitBreaker(name)
+        self.latency = LatencyTracker()
+        self.stage = f"upstream_{name}"
+        self.calls = 0
+        self.in_flight = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    async def call(self, fn: Callable[[list], T]) -> T:
+        self.breaker.check()
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            with span(self.stage):
+                result = await self._hedged(fn)
+        except Exception as e:
+            if self.is_answer(e):
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            self.in_flight -= 1
+        self.breaker.record_success()
+        return result
+
+    def is_answer(self, error: BaseException) -> bool:
+        return isinstance(error, self.answers) and not isinstance(error, self.blocked)
+
+    async def _hedged(self, fn: Callable[[list], T]) -> T:
+        used: list = []
+        started = time.perf_counter()
+        first = asyncio.ensure_future(run_blocking(self.pool, fn, used))
+        attempts = {first}
+        delay = self.latency.hedge_delay() if HEDGE_ENABLED else None
+        error: BaseException | None = None
+
+        while True:
+            try:
+                done, attempts = await asyncio.wait(attempts, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                # The caller went away: stop waiting for the attempts, whose threads
+                # finish on their own
+                for attempt in attempts:
+                    attempt.cancel()
+                raise
+            if not done:
+                # The first attempt is slow: race a second one through another endpoint
+                self.hedged += 1
+                attempts.add(asyncio.ensure_future(run_blocking(self.pool, fn, used)))
+                delay = None
+                continue
+
+            for task in done:
+                if task.exception() is None or self.is_answer(task.exception()):
+                    self.latency.observe(time.perf_counter() - started)
+                    if task is not first:
+                        self.hedge_wins += 1
+                    for loser in attempts:
+                        loser.add_done_callback(_discard_result)
+                    return task.result()
+                error = error or task.exception()
+            # Each attempt already retried failing endpoints, so a failure is final
+            if not attempts:
+                raise error
+            delay = None
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "in_flight": self.in_flight,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95),
+            "breaker": self.breaker.report(),
+        }
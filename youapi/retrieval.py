@@ -0,0 +1,59 @@
+import math
+import re
+from collections import Counter
+
+from prompts import Window
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over transcript windows."""
+
+    def __init__(self, windows: list[Window], k1: float = 1.5, b: float = 0.75):
+        self.windows = windows
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        self.lengths: list[int] = []
+
+        for doc_id, window in enumerate(windows):
+            terms = Counter(tokenize(window.text))
+            self.lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                self.postings.setdefault(term, []).append((doc_id, freq))
+
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        n = len(windows)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        # Rough footprint used for size-bounded caching
+        self.nbytes = sum(len(window.text) for window in windows) * 3
+
+    def search(self, query: str, k: int) -> list[Window]:
+        """Return up to k best-matching windows, in transcript order."""
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for doc_id, freq in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+
+        best = sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+        return [self.windows[doc_id] for doc_id in sorted(best)]
+
+    def sample(self, k: int) -> list[Window]:
+        """Return k windows spread evenly across the transcript."""
+        if len(self.windows) <= k:
+            return list(self.windows)
+        step = len(self.windows) / k
+        return [self.windows[int(i * step)] for i in range(k)]
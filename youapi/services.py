@@ -1,21 +1,297 @@
+import asyncio
+import logging
 import os
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Callable
 from enum import StrEnum
+from typing import TYPE_CHECKING, Any
 
-from convex import ConvexClient
 from dotenv import load_dotenv
 
+from cache import LRUCache
+from concurrency import Lazy, run_blocking
+
+if TYPE_CHECKING:
+    from convex import ConvexClient
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class Source(StrEnum):
     """Enum for video sources."""
     YOUTUBE = "youtube"
 
 
-# Initialize Convex client
+def _convex_client(url: str) -> "ConvexClient":
+    from convex import ConvexClient
+
+    return ConvexClient(url)
+
+
+# Convex client, built on its first query or write (in the "convex" pool)
 convex_url = os.environ.get("CONVEX_URL")
-convex_client = ConvexClient(convex_url) if convex_url else None
+convex_client: "Lazy[ConvexClient] | None" = Lazy(lambda: _convex_client(convex_url)) if convex_url else None
 private_api_key = os.environ.get("PRIVATE_API_KEY")
 
+# Summary requests are written behind the response: repeats of a (user, video) within
+# HISTORY_DEDUPE_SECONDS of its last write are dropped, and writes go to Convex in
+# batches of HISTORY_BATCH_SIZE or every HISTORY_FLUSH_INTERVAL seconds. A failed
+# batch is retried HISTORY_RETRIES times with exponential backoff.
+HISTORY_BATCH_SIZE = int(os.environ.get("HISTORY_BATCH_SIZE", 50))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("HISTORY_FLUSH_INTERVAL", 1))
+HISTORY_DEDUPE_SECONDS = float(os.environ.get("HISTORY_DEDUPE_SECONDS", 60))
+HISTORY_RETRIES = int(os.environ.get("HISTORY_RETRIES", 5))
+HISTORY_RETRY_DELAY = float(os.environ.get("HISTORY_RETRY_DELAY", 0.5))
+HISTORY_MAX_PENDING = int(os.environ.get("HISTORY_MAX_PENDING", 10000))
+# How long shutdown waits for pending writes
+HISTORY_DRAIN_TIMEOUT = float(os.environ.get("HISTORY_DRAIN_TIMEOUT", 10))
+
+# History pages are cached per user for HISTORY_CACHE_TTL; writes through this
+# process update or drop them right away
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", 20))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get("HISTORY_MAX_PAGE_SIZE", 100))
+HISTORY_CACHE_TTL = float(os.environ.get("HISTORY_CACHE_TTL", 300))
+HISTORY_CACHE_MAX_BYTES = int(os.environ.get("HISTORY_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+# Users whose write versions are remembered; see HistoryCache
+HISTORY_MAX_VERSIONS = int(os.environ.get("HISTORY_MAX_VERSIONS", 10000))
+
+
+class HistoryCache:
+    """
+    Per-user cache of history pages, keyed by (cursor, limit); the whole history
+    is cached as the page (None, None).
+
+    Convex orders a user's history by first request, so a repeat request only
+    changes its own row: it is patched in place wherever it is cached. A new video
+    shifts every page, so the user's pages are dropped instead. Each write gives its
+    user a new version from one increasing counter, so a read that raced a write is
+    not cached. Only the most recent writers' versions are kept; other users share
+    the newest version forgotten, so a read that raced a forgotten write is not
+    cached either.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = HISTORY_CACHE_MAX_BYTES,
+        ttl: float = HISTORY_CACHE_TTL,
+        max_versions: int = HISTORY_MAX_VERSIONS,
+    ):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.updated = 0
+        self.invalidated = 0
+        self.max_versions = max_versions
+        self._users: LRUCache[dict[tuple, tuple[dict, float]]] = LRUCache(max_bytes)
+        self._versions: OrderedDict[str, int] = OrderedDict()
+        self._last_version = 0
+        self._forgotten_version = 0
+
+    def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, self._forgotten_version)
+
+    def get(self, user_id: str, cursor: str | None, limit: int | None) -> dict | None:
+        entry = (self._users.get(user_id) or {}).get((cursor, limit))
+        if entry is None or time.monotonic() >= entry[1]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def set(self, user_id: str, cursor: str | None, limit: int | None, page: dict, version: int) -> None:
+        """Cache a page read from Convex, unless user_id wrote since version was taken."""
+        if self.version(user_id) != version:
+            return
+        pages = dict(self._users.get(user_id) or {})
+        pages[(cursor, limit)] = (page, time.monotonic() + self.ttl)
+        self._users.set(user_id, pages, sum(len(str(cached)) for cached, _ in pages.values()))
+
+    def apply(self, record: dict[str, Any]) -> None:
+        """Reflect an upsert of record in the cached pages of its user."""
+        user_id = record["userId"]
+        self._last_version += 1
+        self._versions[user_id] = self._last_version
+        self._versions.move_to_end(user_id)
+        if len(self._versions) > self.max_versions:
+            _, forgotten = self._versions.popitem(last=False)
+            self._forgotten_version = max(self._forgotten_version, forgotten)
+        pages = self._users.get(user_id)
+        if not pages:
+            return
+        rows = [
+            row
+            for page, _ in pages.values()
+            for row in page["page"]
+            if row.get("source") == record["source"] and row.get("videoId") == record["videoId"]
+        ]
+        if not rows:
+            self._users.delete(user_id)
+            self.invalidated += 1
+            return
+        for row in rows:
+            row.update(record, createdAt=time.time() * 1000)
+        self.updated += 1
+
+    def apply_all(self, records: list[dict[str, Any]]) -> None:
+        for record in records:
+            self.apply(record)
+
+    def report(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "updated": self.updated,
+            "invalidated": self.invalidated,
+            "users": len(self._users),
+        }
+
+
+history_cache = HistoryCache()
+
+
+class HistoryWriter:
+    """
+    Write-behind queue for summaryRequests upserts.
+
+    add() only queues the record, so callers never wait for Convex. A pending
+    record for the same (user, source, video) is replaced by the newer one.
+    """
+
+    def __init__(
+        self,
+        client: "Lazy[ConvexClient] | None",
+        batch_size: int = HISTORY_BATCH_SIZE,
+        flush_interval: float = HISTORY_FLUSH_INTERVAL,
+        dedupe_seconds: float = HISTORY_DEDUPE_SECONDS,
+        on_written: Callable[[list[dict[str, Any]]], None] | None = None,
+    ):
+        self.client = client
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedupe_seconds = dedupe_seconds
+        self.queued = 0
+        self.deduped = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self._pending: OrderedDict[tuple, dict[str, Any]] = OrderedDict()
+        # When each recently written key was written, oldest first
+        self._written_at: OrderedDict[tuple, float] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    def add(self, record: dict[str, Any]) -> None:
+        key = (record["userId"], record["source"], record["videoId"])
+        if key in self._pending:
+            self._pending[key] = record
+            self.deduped += 1
+            return
+        written_at = self._written_at.get(key)
+        if written_at is not None and time.monotonic() - written_at < self.dedupe_seconds:
+            self.deduped += 1
+            return
+        if len(self._pending) >= HISTORY_MAX_PENDING:
+            self.dropped += 1
+            logger.warning("History queue full, dropping write for %s", key)
+            return
+        self._pending[key] = record
+        self.queued += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = HISTORY_DRAIN_TIMEOUT) -> None:
+        """Flush everything pending, waiting at most timeout seconds."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error("History queue not drained on shutdown, %d writes lost", len(self._pending))
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            if not self._closing and len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            while self._pending:
+                await self._flush(self._take_batch())
+            self._forget_old_writes()
+            if self._closing and not self._pending:
+                return
+
+    def _take_batch(self) -> list[tuple[tuple, dict[str, Any]]]:
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False))
+        return batch
+
+    async def _flush(self, batch: list[tuple[tuple, dict[str, Any]]]) -> None:
+        records = [record for _, record in batch]
+        for attempt in range(HISTORY_RETRIES + 1):
+            try:
+                await run_blocking("convex", self._write, records)
+                break
+            except Exception:
+                if attempt == HISTORY_RETRIES:
+                    self.failed += len(records)
+                    logger.exception("Dropping %d history writes after %d attempts", len(records), attempt + 1)
+                    return
+                self.retries += 1
+                delay = HISTORY_RETRY_DELAY * 2**attempt
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        self.written += len(records)
+        self.batches += 1
+        if self.on_written is not None:
+            self.on_written(records)
+        now = time.monotonic()
+        for key, _ in batch:
+            self._written_at[key] = now
+            self._written_at.move_to_end(key)
+
+    def _write(self, records: list[dict[str, Any]]) -> None:
+        if not self.client:
+            return
+        self.client.get().mutation("summaryRequests:upsertMany", {"apiKey": private_api_key, "requests": records})
+
+    def _forget_old_writes(self) -> None:
+        cutoff = time.monotonic() - self.dedupe_seconds
+        while self._written_at and next(iter(self._written_at.values())) < cutoff:
+            self._written_at.popitem(last=False)
+
+    def report(self) -> dict[str, int]:
+        return {
+            "queued": self.queued,
+            "pending": len(self._pending),
+            "deduped": self.deduped,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+
+# Written rows are applied to the history cache again once in Convex, so a page
+# read while the write was queued is not served stale
+history_writer = HistoryWriter(convex_client, on_written=history_cache.apply_all)
+
 
 def save_summary_request(
     user_id: str,
@@ -26,29 +302,43 @@ def save_summary_request(
     length: int,
     source: Source = Source.YOUTUBE,
 ) -> None:
-    """Save or update a user's summary request to Convex."""
+    """Queue a save or update of a user's summary request to Convex; call it from the event loop."""
     if not convex_client:
         return
-    convex_client.mutation(
-        "summaryRequests:upsert",
+    record = {
+        "userId": user_id,
+        "source": source,
+        "videoId": video_id,
+        "title": title,
+        "author": author,
+        "thumbnailUrl": thumbnail_url,
+        "length": length,
+    }
+    history_cache.apply(record)
+    history_writer.add(record)
+
+
+def get_user_history(user_id: str, cursor: str | None = None, limit: int | None = None) -> dict:
+    """
+    Get a user's summary request history from Convex, newest first.
+
+    Returns {"page": [...], "isDone": bool, "continueCursor": str}; pass
+    continueCursor back as cursor for the next page. Without a limit the whole
+    history is returned as a single page.
+    """
+    if not convex_client:
+        return {"page": [], "isDone": True, "continueCursor": ""}
+    if limit is None:
+        history = convex_client.get().query(
+            "summaryRequests:listByUser",
+            {"apiKey": private_api_key, "userId": user_id},
+        )
+        return {"page": history, "isDone": True, "continueCursor": ""}
+    return convex_client.get().query(
+        "summaryRequests:listByUserPage",
         {
             "apiKey": private_api_key,
             "userId": user_id,
-            "source": source,
-            "videoId": video_id,
-            "title": title,
-            "author": author,
-            "thumbnailUrl": thumbnail_url,
-            "length": length,
+            "paginationOpts": {"numItems": limit, "cursor": cursor},
         },
     )
-
-
-def get_user_history(user_id: str) -> list:
-    """Get user's summary request history from Convex."""
-    if not convex_client:
-        return []
-    return convex_client.query(
-        "summaryRequests:listByUser",
-        {"apiKey": private_api_key, "userId": user_id},
-    )
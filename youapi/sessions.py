@@ -0,0 +1,97 @@
+import json
+import math
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+
+from cache import SQLiteStore
+from prompts import count_tokens
+
+
+@dataclass
+class ChatTurn:
+    role: str  # "user" or "assistant"
+    content: str
+    # Transcript excerpts sent along with a user turn on long videos; only the turn
+    # being answered has them, so they are not resent with every later turn
+    context: str | None = None
+
+    def render(self) -> str:
+        if self.context:
+            return f"{self.context}\n\nQuestion: {self.content}"
+        return self.content
+
+
+@dataclass
+class ChatSession:
+    """
+    Server-side chat history for one user and video.
+
+    Older turns are folded into a running summary so the history sent to the model
+    stays bounded; the most recent turns are kept verbatim.
+    """
+
+    summary: str = ""
+    turns: list[ChatTurn] = field(default_factory=list)
+
+    def history_tokens(self) -> int:
+        return count_tokens(self.summary) + sum(count_tokens(turn.render()) for turn in self.turns)
+
+    def compactable(self, token_limit: int, keep_turns: int) -> list[ChatTurn]:
+        """Oldest turns to fold into the summary, or none while under token_limit."""
+        if len(self.turns) <= keep_turns or self.history_tokens() <= token_limit:
+            return []
+        # Keep whole exchanges: the verbatim history starts with a user turn
+        cut = len(self.turns) - keep_turns
+        while cut > 0 and self.turns[cut].role != "user":
+            cut -= 1
+        return self.turns[:cut]
+
+    def apply_summary(self, summary: str, folded: list[ChatTurn]) -> bool:
+        """Replace folded turns with summary, unless the history changed underneath."""
+        if self.turns[:len(folded)] != folded:
+            return False
+        self.summary = summary
+        self.turns = self.turns[len(folded):]
+        return True
+
+    def to_bytes(self) -> bytes:
+        return json.dumps(asdict(self)).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ChatSession":
+        raw = json.loads(data)
+        return cls(raw["summary"], [ChatTurn(**turn) for turn in raw["turns"]])
+
+
+class ChatSessionStore:
+    """
+    Chat sessions in SQLite, read and written through on every turn.
+
+    There is no in-process copy, so every worker sees the latest history, and no
+    TTL or size limit: a session is kept until it is deleted. Changes go through
+    update(), which reads and writes in one transaction so concurrent turns on the
+    same session are not lost. The methods block, so coroutines call them through
+    run_blocking.
+    """
+
+    def __init__(self, path: str):
+        self._store = SQLiteStore(path, table="chat_sessions", ttl=math.inf)
+
+    def get(self, key: str) -> ChatSession | None:
+        row = self._store.get(key)
+        return ChatSession.from_bytes(row[0]) if row is not None else None
+
+    def set(self, key: str, session: ChatSession) -> None:
+        self._store.set(key, session.to_bytes())
+
+    def update(self, key: str, change: Callable[[ChatSession], bool]) -> None:
+        """Apply change to the stored session, or a new one; it returns whether to save."""
+
+        def apply(data: bytes | None) -> bytes | None:
+            session = ChatSession.from_bytes(data) if data is not None else ChatSession()
+            return session.to_bytes() if change(session) else None
+
+        self._store.update(key, apply)
+
+    def delete(self, key: str) -> None:
+        self._store.delete(key)
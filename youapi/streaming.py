@@ -0,0 +1,339 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
+
+from fastapi.responses import StreamingResponse
+
+from concurrency import Lazy, get_executor
+from metrics import METRICS_ENABLED, current_endpoint, llm_time_to_first_token, llm_tokens_per_second, observe_stage
+
+if TYPE_CHECKING:
+    from ai_sdk.types import CoreMessage
+    from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+# Deltas are coalesced into one SSE frame until SSE_FLUSH_INTERVAL seconds pass or
+# SSE_FLUSH_BYTES characters accumulate. A keep-alive comment is sent after
+# SSE_KEEPALIVE_INTERVAL seconds without output.
+SSE_FLUSH_INTERVAL = float(os.environ.get("SSE_FLUSH_INTERVAL", 0.03))
+SSE_FLUSH_BYTES = int(os.environ.get("SSE_FLUSH_BYTES", 512))
+SSE_KEEPALIVE_INTERVAL = float(os.environ.get("SSE_KEEPALIVE_INTERVAL", 15))
+# Deltas read ahead of a slow client before the upstream is paused
+SSE_MAX_PENDING = int(os.environ.get("SSE_MAX_PENDING", 256))
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+}
+
+SSE_DONE = "data: [DONE]\n\n"
+SSE_KEEPALIVE = ": keep-alive\n\n"
+
+_END = object()
+
+
+def sse_data(chunk: str) -> str:
+    # Encode newlines to preserve them in SSE format
+    encoded = chunk.replace("\n", "\\n")
+    return f"data: {encoded}\n\n"
+
+
+class StreamStats:
+    """Timing for one stream. Each model delta counts as one token."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.first_token_at: float | None = None
+        self.finished_at: float | None = None
+        self.tokens = 0
+        self.frames = 0
+        # Time spent suspended in yield, i.e. handing frames to the server and client
+        self.write_seconds = 0.0
+        self.cancelled = False
+
+    def record(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.tokens += 1
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def tokens_per_second(self) -> float | None:
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return self.tokens / elapsed if elapsed > 0 else None
+
+
+class StreamMetrics:
+    """
+    Aggregate of finished streams, per endpoint name.
+
+    Tokens saved by cancelled streams are estimated from the average length of the
+    completed streams of the same endpoint.
+    """
+
+    def __init__(self):
+        self._totals: dict[str, dict[str, float]] = {}
+        self.in_flight: dict[str, int] = {}
+
+    def start(self, name: str) -> None:
+        self.in_flight[name] = self.in_flight.get(name, 0) + 1
+
+    def observe(self, stats: StreamStats) -> None:
+        self.in_flight[stats.name] -= 1
+        totals = self._totals.setdefault(
+            stats.name,
+            {
+                "streams": 0,
+                "tokens": 0,
+                "frames": 0,
+                "ttft_sum": 0.0,
+                "ttft_count": 0,
+                "token_seconds": 0.0,
+                "completed": 0,
+                "completed_tokens": 0,
+                "cancelled": 0,
+                "tokens_saved": 0,
+            },
+        )
+        totals["streams"] += 1
+        totals["tokens"] += stats.tokens
+        if stats.cancelled:
+            totals["cancelled"] += 1
+            if totals["completed"]:
+                expected = totals["completed_tokens"] / totals["completed"]
+                totals["tokens_saved"] += max(0, round(expected) - stats.tokens)
+        else:
+            totals["completed"] += 1
+            totals["completed_tokens"] += stats.tokens
+        totals["frames"] += stats.frames
+        if stats.time_to_first_token is not None:
+            totals["ttft_sum"] += stats.time_to_first_token
+            totals["ttft_count"] += 1
+        if stats.first_token_at is not None and stats.finished_at is not None:
+            totals["token_seconds"] += stats.finished_at - stats.first_token_at
+
+    def report(self) -> dict[str, dict[str, float]]:
+        report = {}
+        for name, totals in self._totals.items():
+            report[name] = {
+                "streams": totals["streams"],
+                "in_flight": self.in_flight.get(name, 0),
+                "tokens": totals["tokens"],
+                "frames": totals["frames"],
+                "avg_time_to_first_token": (
+                    totals["ttft_sum"] / totals["ttft_count"] if totals["ttft_count"] else None
+                ),
+                "tokens_per_second": (
+                    totals["tokens"] / totals["token_seconds"] if totals["token_seconds"] else None
+                ),
+                "cancelled": totals["cancelled"],
+                "tokens_saved": totals["tokens_saved"],
+            }
+        return report
+
+
+stream_metrics = StreamMetrics()
+
+
+async def coalesce_sse(deltas: AsyncIterator[str], stats: StreamStats) -> AsyncIterator[str]:
+    """
+    Turn model deltas into SSE frames.
+
+    The first delta is sent immediately; after that, deltas are batched by time and
+    size. Reading runs in a separate task through a bounded queue, so a client that
+    stops reading pauses the upstream instead of growing a buffer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_MAX_PENDING)
+
+    async def pump():
+        try:
+            async for delta in deltas:
+                if delta:
+                    await queue.put(delta)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(e)
+
+    reader = asyncio.create_task(pump())
+    stream_metrics.start(stats.name)
+    buffer: list[str] = []
+    size = 0
+    deadline = 0.0
+
+    def flush() -> str:
+        nonlocal size
+        frame = sse_data("".join(buffer))
+        buffer.clear()
+        size = 0
+        stats.frames += 1
+        return frame
+
+    try:
+        while True:
+            timeout = max(0.0, deadline - loop.time()) if buffer else SSE_KEEPALIVE_INTERVAL
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                frame = flush() if buffer else SSE_KEEPALIVE
+                written = time.perf_counter()
+                yield frame
+                stats.write_seconds += time.perf_counter() - written
+                continue
+
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            first = stats.first_token_at is None
+            stats.record()
+            if not buffer:
+                deadline = loop.time() + SSE_FLUSH_INTERVAL
+            buffer.append(item)
+            size += len(item)
+            if first or size >= SSE_FLUSH_BYTES or loop.time() >= deadline:
+                frame = flush()
+                written = time.perf_counter()
+                yield frame
+                stats.write_seconds += time.perf_counter() - written
+
+        written = time.perf_counter()
+        if buffer:
+            yield flush()
+        yield SSE_DONE
+        stats.write_seconds += time.perf_counter() - written
+    except (asyncio.CancelledError, GeneratorExit):
+        # The client went away; cancelling the reader closes the upstream stream
+        stats.cancelled = True
+        raise
+    finally:
+        reader.cancel()
+        stats.finished_at = time.perf_counter()
+        stream_metrics.observe(stats)
+        observe_stage("sse_write", stats.write_seconds)
+        logger.info(
+            "%s stream%s: ttft=%s tokens=%d frames=%d tokens/s=%s",
+            stats.name,
+            " cancelled" if stats.cancelled else "",
+            f"{stats.time_to_first_token:.3f}s" if stats.time_to_first_token is not None else "-",
+            stats.tokens,
+            stats.frames,
+            f"{stats.tokens_per_second:.1f}" if stats.tokens_per_second is not None else "-",
+        )
+
+
+def sse_response(name: str, deltas: AsyncIterator[str]) -> StreamingResponse:
+    """Stream model deltas to the client as coalesced SSE frames."""
+    return StreamingResponse(
+        coalesce_sse(deltas, StreamStats(name)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+def _openai_client() -> "OpenAI":
+    from openai import OpenAI
+
+    return OpenAI()
+
+
+# Client for streamed completions, built on first use from OPENAI_API_KEY and OPENAI_BASE_URL
+openai_client: "Lazy[OpenAI]" = Lazy(_openai_client)
+
+
+def chat_messages(prompt: str | None = None, messages: "list[CoreMessage] | None" = None) -> list[dict]:
+    if messages is not None:
+        return [message.to_dict() for message in messages]
+    return [{"role": "user", "content": prompt}]
+
+
+async def stream_completion(
+    model: str,
+    *,
+    prompt: str | None = None,
+    messages: "list[CoreMessage] | None" = None,
+) -> AsyncIterator[str]:
+    """
+    Stream text deltas from a chat completion.
+
+    Unlike ai_sdk's stream_text, closing or cancelling the iterator closes the HTTP
+    response, so the provider stops generating once nobody is reading. The reading
+    thread holds at most SSE_MAX_PENDING deltas the iterator has not taken; beyond
+    that it stops reading, so a paused client pauses the provider too.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    # One permit per delta the thread may read ahead; the iterator returns them
+    pending = threading.Semaphore(SSE_MAX_PENDING)
+    stopped = threading.Event()
+    requested = time.perf_counter()
+    response = await loop.run_in_executor(
+        get_executor("streams"),
+        lambda: openai_client.get().chat.completions.create(
+            model=model,
+            messages=chat_messages(prompt, messages),
+            stream=True,
+        ),
+    )
+
+    def put(item) -> None:
+        if not stopped.is_set():
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def produce() -> None:
+        try:
+            for chunk in response:
+                if stopped.is_set():
+                    break
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    pending.acquire()
+                    if stopped.is_set():
+                        break
+                    put(content)
+            put(_END)
+        except Exception as e:
+            put(e)
+        finally:
+            response.close()
+
+    get_executor("streams").submit(produce)
+    first_token_at = None
+    tokens = 0
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            pending.release()
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            tokens += 1
+            yield item
+    finally:
+        if METRICS_ENABLED and first_token_at is not None:
+            endpoint = current_endpoint.get()
+            llm_time_to_first_token.observe(first_token_at - requested, endpoint, model)
+            elapsed = time.perf_counter() - first_token_at
+            if tokens > 1 and elapsed > 0:
+                llm_tokens_per_second.observe((tokens - 1) / elapsed, endpoint, model)
+        stopped.set()
+        # Wake produce() if it is waiting for a permit, and abort its blocking read
+        pending.release()
+        response.close()
@@ -0,0 +1,25 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+# main reads its settings at import time: no disk cache, Clerk or Convex in tests,
+# and chat sessions in a throwaway database
+os.environ["CACHE_DISK_ENABLED"] = "false"
+os.environ["CLERK_SECRET_KEY"] = ""
+os.environ["CONVEX_URL"] = ""
+os.environ["CHAT_SESSION_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "youapi.sqlite3")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A test client whose requests are signed in as user_test."""
+    import main
+
+    async def authenticate(request):
+        return SimpleNamespace(is_signed_in=True, payload={"sub": "user_test"})
+
+    monkeypatch.setattr(main.authenticator, "authenticate", authenticate)
+    return TestClient(main.app)
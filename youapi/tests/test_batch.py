@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from fastapi import HTTPException
+
+import main
+from transcripts import CompactTranscript, SegmentView
+
+
+def test_failed_items_do_not_fail_the_batch(client, monkeypatch):
+    async def get_transcript_data(video_id, lang):
+        if video_id == "missing0001":
+            raise HTTPException(status_code=404, detail="No transcript found")
+        if video_id == "broken00001":
+            raise RuntimeError("parser error")
+        return CompactTranscript.from_segments(video_id, "English", "en", False, [SegmentView("hello", 0.0, 1.0)])
+
+    monkeypatch.setattr(main, "get_transcript_data", get_transcript_data)
+    video_ids = ["working0001", "missing0001", "not a video", "broken00001"]
+    response = client.post("/youtube/transcript/batch", json={"video_ids": video_ids})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+    assert sorted(lines) == [0, 1, 2, 3]
+    assert lines[0]["video_id"] == "working0001"
+    assert lines[0]["result"]["video_id"] == "working0001"
+    assert lines[0]["result"]["segments"][0]["text"] == "hello"
+    assert lines[1] == {"index": 1, "video_id": "missing0001", "error": {"status": 404, "detail": "No transcript found"}}
+    assert lines[2]["error"]["status"] == 400
+    assert "result" not in lines[2]
+    assert lines[3] == {"index": 3, "video_id": "broken00001", "error": {"status": 500, "detail": "parser error"}}
+
+
+def test_lines_are_sent_in_completion_order():
+    async def fetch(video_id):
+        await asyncio.sleep(0.05 if video_id == "slowvideo01" else 0)
+        return json.dumps(video_id).encode()
+
+    async def scenario():
+        return [json.loads(line) async for line in main.run_batch(["slowvideo01", "fastvideo01"], fetch)]
+
+    lines = asyncio.run(scenario())
+    assert [line["index"] for line in lines] == [1, 0]
+    assert [line["result"] for line in lines] == ["fastvideo01", "slowvideo01"]
+
+
+def test_client_going_away_cancels_and_awaits_the_remaining_fetches(monkeypatch):
+    monkeypatch.setattr(main, "BATCH_CONCURRENCY", 2)
+    started, cleaned_up = [], []
+
+    async def fetch(video_id):
+        started.append(video_id)
+        try:
+            if video_id != "fastvideo00":
+                await asyncio.sleep(10)
+            return b"{}"
+        finally:
+            # Cleanup that itself has to wait, like closing a connection
+            await asyncio.sleep(0.01)
+            cleaned_up.append(video_id)
+
+    async def scenario():
+        lines = main.run_batch(["fastvideo00", "slowvideo01", "slowvideo02", "slowvideo03"], fetch)
+        first = await lines.__anext__()
+        await lines.aclose()
+        # Nothing is left running once the response is closed
+        return first, list(cleaned_up), [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    first, cleaned_up_on_close, pending = asyncio.run(scenario())
+    assert json.loads(first)["index"] == 0
+    assert sorted(cleaned_up_on_close) == sorted(started)
+    assert pending == []
+    # Queued fetches never start
+    assert len(started) <= 3
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+from fastapi import Request
+
+import main
+from sessions import ChatSession, ChatSessionStore, ChatTurn
+
+TRANSCRIPT = "a short transcript about concurrent chat turns"
+
+
+def signed_in_request(user_id: str) -> Request:
+    request = Request({"type": "http"})
+    request.state.auth = SimpleNamespace(is_signed_in=True, payload={"sub": user_id})
+    return request
+
+
+def test_concurrent_updates_from_threads_are_all_kept(tmp_path):
+    store = ChatSessionStore(os.path.join(tmp_path, "sessions.sqlite3"))
+
+    def append(index: int):
+        def change(session: ChatSession) -> bool:
+            session.turns.append(ChatTurn("user", f"question {index}"))
+            return True
+
+        store.update("user:video", change)
+
+    threads = [threading.Thread(target=append, args=(index,)) for index in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    contents = sorted(turn.content for turn in store.get("user:video").turns)
+    assert contents == sorted(f"question {index}" for index in range(20))
+
+
+def test_update_that_declines_leaves_the_session_as_it_is(tmp_path):
+    store = ChatSessionStore(os.path.join(tmp_path, "sessions.sqlite3"))
+    store.update("user:video", lambda session: False)
+    assert store.get("user:video") is None
+
+
+def test_concurrent_messages_in_one_session_are_all_kept(monkeypatch):
+    async def stream_completion(model, *, prompt=None, messages=None):
+        question = messages[-1].content
+        # The answers finish in the opposite order to the questions
+        await asyncio.sleep(0.01 * (10 - int(question.split()[-1])))
+        yield f"answer to {question}"
+
+    monkeypatch.setattr(main, "stream_completion", stream_completion)
+
+    async def send(index: int):
+        response = await main.chat_session_message(
+            main.ChatSessionRequest(video_id="session0001", message=f"question {index}", transcript=TRANSCRIPT),
+            signed_in_request("user_concurrent"),
+        )
+        return [frame async for frame in response.body_iterator]
+
+    async def scenario():
+        await asyncio.gather(*(send(index) for index in range(10)))
+
+    asyncio.run(scenario())
+    session = main.chat_sessions.get(main.chat_session_key("user_concurrent", "session0001"))
+    exchanges = {
+        (question.content, answer.content) for question, answer in zip(session.turns[::2], session.turns[1::2])
+    }
+    assert exchanges == {(f"question {index}", f"answer to question {index}") for index in range(10)}
+
+
+def test_session_language_is_in_the_system_prompt(monkeypatch):
+    prompts = []
+
+    async def stream_completion(model, *, prompt=None, messages=None):
+        prompts.append(messages[0].content)
+        yield "xin chào"
+
+    monkeypatch.setattr(main, "stream_completion", stream_completion)
+
+    async def scenario():
+        response = await main.chat_session_message(
+            main.ChatSessionRequest(video_id="session0002", message="hello", transcript=TRANSCRIPT, language="vi"),
+            signed_in_request("user_language"),
+        )
+        return [frame async for frame in response.body_iterator]
+
+    asyncio.run(scenario())
+    assert "Always respond in Vietnamese" in prompts[0]
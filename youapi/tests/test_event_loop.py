@@ -0,0 +1,119 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi import Request
+
+import main
+from cache import TieredCache
+from concurrency import Lazy
+
+# Each structured generation blocks its thread this long
+GENERATION_SECONDS = 1.0
+# Stub model: one delta every TOKEN_INTERVAL seconds
+TOKENS = 60
+TOKEN_INTERVAL = 0.02
+# Frames may be TOKEN_INTERVAL plus SSE_FLUSH_INTERVAL apart; a blocked loop stalls them for seconds
+MAX_FRAME_GAP = 0.25
+
+
+class BlockingSDK:
+    """ai_sdk stand-in whose generate_object blocks like the real synchronous SDK."""
+
+    def __init__(self):
+        self.generations = 0
+
+    def openai(self, model_name: str) -> str:
+        return model_name
+
+    def generate_object(self, *, model, schema, prompt):
+        time.sleep(GENERATION_SECONDS)
+        self.generations += 1
+        return SimpleNamespace(object=schema(chapters=[main.Chapter(title="Intro", start=0.0)]))
+
+
+async def fake_stream_completion(model, *, prompt=None, messages=None):
+    for i in range(TOKENS):
+        await asyncio.sleep(TOKEN_INTERVAL)
+        yield f"token {i} "
+
+
+def test_summary_stream_stays_flat_during_chapter_generation(monkeypatch):
+    sdk = BlockingSDK()
+    monkeypatch.setattr(main, "ai_sdk", Lazy(lambda: sdk))
+    monkeypatch.setattr(main, "stream_completion", fake_stream_completion)
+    segments = [main.TranscriptSegment(text=f"segment {i}", start=i * 2.0, duration=2.0) for i in range(200)]
+
+    async def run() -> tuple[list[float], float]:
+        response = await main.summarize_video(
+            main.SummarizeRequest(video_id="dQw4w9WgXcQ", transcript="a transcript about frame gaps"),
+            Request({"type": "http"}),
+        )
+        gaps = []
+
+        async def read() -> None:
+            last = time.perf_counter()
+            async for _ in response.body_iterator:
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        started = time.perf_counter()
+        # Different languages, so the two generations are not coalesced into one
+        await asyncio.gather(
+            read(),
+            *(
+                main.generate_chapters(
+                    main.GenerateChaptersRequest(video_id="dQw4w9WgXcQ", segments=segments, language=language),
+                    Request({"type": "http"}),
+                )
+                for language in ("en", "fr")
+            ),
+        )
+        return gaps, time.perf_counter() - started
+
+    gaps, elapsed = asyncio.run(run())
+
+    assert sdk.generations == 2
+    # Both generations overlapped the stream, which was not held up by them
+    assert elapsed < GENERATION_SECONDS + TOKENS * TOKEN_INTERVAL
+    assert len(gaps) > 10
+    assert max(gaps) < MAX_FRAME_GAP, f"largest SSE frame gap {max(gaps):.3f}s"
+
+
+class SlowStore:
+    """SQLiteStore stand-in whose reads block the calling thread."""
+
+    def get(self, key):
+        time.sleep(0.3)
+        return b"value", time.time() + 60
+
+    def set(self, key, value, ttl=None):
+        time.sleep(0.3)
+
+    def delete(self, key):
+        pass
+
+
+def test_disk_tier_runs_off_the_event_loop():
+    cache = TieredCache("test", str.encode, bytes.decode, max_bytes=1024, ttl=60, store=SlowStore())
+
+    async def run() -> tuple[str | None, float]:
+        ticks = []
+
+        async def tick() -> None:
+            for _ in range(40):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        value = await cache.aget("key")
+        await cache.aset("other", "value")
+        await ticker
+        return value, max(b - a for a, b in zip(ticks, ticks[1:]))
+
+    value, largest_tick_gap = asyncio.run(run())
+
+    assert value == "value"
+    assert cache.report()["disk_hits"] == 1
+    assert largest_tick_gap < 0.1
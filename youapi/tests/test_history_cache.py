@@ -0,0 +1,56 @@
+import main
+from services import HistoryCache
+
+PAGE = {"page": [], "isDone": True, "continueCursor": ""}
+
+
+def write(cache: HistoryCache, user_id: str) -> None:
+    cache.apply({"userId": user_id, "source": "youtube", "videoId": "dQw4w9WgXcQ"})
+
+
+def test_versions_are_bounded():
+    cache = HistoryCache(max_versions=3)
+    for index in range(100):
+        write(cache, f"user_{index}")
+    assert len(cache._versions) == 3
+
+
+def test_read_racing_a_forgotten_write_is_not_cached():
+    cache = HistoryCache(max_versions=2)
+    version = cache.version("user_a")
+    write(cache, "user_a")
+    # user_a's version is pushed out by later writers before the read completes
+    write(cache, "user_b")
+    write(cache, "user_c")
+    cache.set("user_a", None, 20, PAGE, version)
+    assert cache.get("user_a", None, 20) is None
+
+
+def test_read_without_a_racing_write_is_cached():
+    cache = HistoryCache(max_versions=2)
+    write(cache, "user_b")
+    version = cache.version("user_a")
+    cache.set("user_a", None, 20, PAGE, version)
+    assert cache.get("user_a", None, 20) == PAGE
+
+
+def test_history_without_a_limit_is_the_whole_list(client, monkeypatch):
+    calls = []
+
+    def get_user_history(user_id, cursor=None, limit=None):
+        calls.append((cursor, limit))
+        if limit is None:
+            return {"page": [{"videoId": str(index)} for index in range(30)], "isDone": True, "continueCursor": ""}
+        return {"page": [{"videoId": "0"}], "isDone": False, "continueCursor": "next"}
+
+    monkeypatch.setattr(main, "get_user_history", get_user_history)
+    monkeypatch.setattr(main, "history_cache", HistoryCache())
+
+    response = client.get("/history").json()
+    assert len(response["history"]) == 30
+    assert response["cursor"] is None
+
+    assert client.get("/history", params={"limit": 1}).json() == {"history": [{"videoId": "0"}], "cursor": "next"}
+    client.get("/history", params={"cursor": "next"})
+    client.get("/history")
+    assert calls == [(None, None), (None, 1), ("next", main.HISTORY_PAGE_SIZE)]
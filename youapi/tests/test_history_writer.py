@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+import services
+from concurrency import Lazy
+from services import HistoryWriter
+
+
+class FakeConvex:
+    """Records upsertMany batches; the first `failures` calls raise."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.batches: list[list[dict]] = []
+        self.calls: list[float] = []
+
+    def mutation(self, name: str, args: dict) -> None:
+        assert name == "summaryRequests:upsertMany"
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("convex unavailable")
+        self.batches.append(args["requests"])
+
+
+def record(video_id: str, title: str = "Title", user_id: str = "user_1") -> dict:
+    return {"userId": user_id, "source": "youtube", "videoId": video_id, "title": title}
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(services, "HISTORY_RETRY_DELAY", 0.05)
+    monkeypatch.setattr(services, "HISTORY_RETRIES", 3)
+    # No jitter, so the backoff is exact
+    monkeypatch.setattr(services.random, "uniform", lambda low, high: 1.0)
+
+
+def writer_for(convex: FakeConvex, **kwargs) -> HistoryWriter:
+    kwargs.setdefault("batch_size", 10)
+    kwargs.setdefault("flush_interval", 10)
+    return HistoryWriter(Lazy(lambda: convex), **kwargs)
+
+
+def test_pending_record_is_replaced_and_recent_write_dropped():
+    async def scenario(convex):
+        writer = writer_for(convex)
+        writer.start()
+        writer.add(record("a", "old"))
+        writer.add(record("a", "new"))
+        writer.add(record("b"))
+        await writer.close()
+        # Written within the dedupe window
+        writer.add(record("a", "newer"))
+        writer.start()
+        await writer.close()
+        return writer
+
+    convex = FakeConvex()
+    writer = asyncio.run(scenario(convex))
+    assert [[(r["videoId"], r["title"]) for r in batch] for batch in convex.batches] == [
+        [("a", "new"), ("b", "Title")]
+    ]
+    assert (writer.queued, writer.deduped, writer.written) == (2, 2, 2)
+
+
+def test_full_batch_is_written_without_waiting_for_the_interval():
+    async def scenario(convex):
+        writer = writer_for(convex, batch_size=3, flush_interval=10)
+        writer.start()
+        for video_id in "abc":
+            writer.add(record(video_id))
+        await asyncio.sleep(0.2)
+        full = [len(batch) for batch in convex.batches]
+        writer.add(record("d"))
+        await asyncio.sleep(0.2)
+        partial = [len(batch) for batch in convex.batches]
+        await writer.close()
+        return full, partial
+
+    convex = FakeConvex()
+    assert asyncio.run(scenario(convex)) == ([3], [3])
+    assert [len(batch) for batch in convex.batches] == [3, 1]
+
+
+def test_partial_batch_is_written_after_the_interval():
+    async def scenario(convex):
+        writer = writer_for(convex, batch_size=10, flush_interval=0.2)
+        writer.start()
+        writer.add(record("a"))
+        await asyncio.sleep(0.05)
+        before = len(convex.batches)
+        await asyncio.sleep(0.3)
+        after = len(convex.batches)
+        await writer.close()
+        return before, after
+
+    assert asyncio.run(scenario(FakeConvex())) == (0, 1)
+
+
+def test_failed_batch_is_retried_with_exponential_backoff():
+    async def scenario(convex):
+        writer = writer_for(convex)
+        writer.start()
+        writer.add(record("a"))
+        await writer.close()
+        return writer
+
+    convex = FakeConvex(failures=3)
+    writer = asyncio.run(scenario(convex))
+    assert len(convex.batches) == 1
+    assert (writer.retries, writer.written, writer.failed) == (3, 1, 0)
+    gaps = [later - earlier for earlier, later in zip(convex.calls, convex.calls[1:])]
+    for gap, expected in zip(gaps, [0.05, 0.1, 0.2]):
+        assert expected <= gap < expected + 0.05
+
+
+def test_batch_is_dropped_after_the_last_retry():
+    async def scenario(convex):
+        writer = writer_for(convex)
+        writer.start()
+        writer.add(record("a"))
+        writer.add(record("b"))
+        await writer.close()
+        return writer
+
+    convex = FakeConvex(failures=100)
+    writer = asyncio.run(scenario(convex))
+    assert len(convex.calls) == services.HISTORY_RETRIES + 1
+    assert (writer.written, writer.failed) == (0, 2)
+
+
+def test_close_drains_everything_pending():
+    async def scenario(convex):
+        writer = writer_for(convex, batch_size=4, flush_interval=10)
+        writer.start()
+        for index in range(10):
+            writer.add(record(f"video{index}"))
+        await writer.close()
+        return writer
+
+    convex = FakeConvex()
+    writer = asyncio.run(scenario(convex))
+    assert [len(batch) for batch in convex.batches] == [4, 4, 2]
+    assert writer.report()["pending"] == 0
+    assert writer.written == 10
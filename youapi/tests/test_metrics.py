@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def anonymous(monkeypatch):
+    """A test client whose requests carry no Clerk session."""
+
+    async def authenticate(request):
+        return SimpleNamespace(is_signed_in=False, payload=None)
+
+    monkeypatch.setattr(main.authenticator, "authenticate", authenticate)
+    monkeypatch.setattr(main, "METRICS_TOKEN", None)
+    monkeypatch.setattr(main, "METRICS_PUBLIC", False)
+    return TestClient(main.app)
+
+
+def test_metrics_require_a_session_by_default(anonymous):
+    assert anonymous.get("/metrics").status_code == 401
+
+
+def test_signed_in_session_can_read_the_metrics(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", None)
+    monkeypatch.setattr(main, "METRICS_PUBLIC", False)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "youapi_cache_hits_total" in response.text
+
+
+def test_metrics_are_open_when_configured_public(anonymous, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_PUBLIC", True)
+    assert anonymous.get("/metrics").status_code == 200
+
+
+def test_metrics_token_replaces_the_session(anonymous, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-secret")
+    assert anonymous.get("/metrics").status_code == 401
+    assert anonymous.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert anonymous.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
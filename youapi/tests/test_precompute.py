@@ -0,0 +1,164 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import ANY
+
+import main
+from concurrency import Lazy
+from precompute import PrecomputeQueue, UserCounter
+from transcripts import CompactTranscript, SegmentView
+
+
+def test_counts_distinct_users():
+    counter = UserCounter()
+    assert [counter.add("video", "user_a") for _ in range(4)] == [1, 1, 1, 1]
+    assert counter.add("video", "user_b") == 2
+    assert counter.add("other", "user_a") == 1
+
+
+def test_users_outside_the_window_are_not_counted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("precompute.time.monotonic", lambda: now[0])
+    counter = UserCounter(window=60)
+    counter.add("video", "user_a")
+    now[0] += 30
+    assert counter.add("video", "user_b") == 2
+    now[0] += 45
+    assert counter.add("video", "user_c") == 2
+
+
+def test_keys_and_users_are_bounded():
+    counter = UserCounter(max_keys=2, max_users=3)
+    for index in range(10):
+        counter.add("video", f"user_{index}")
+        counter.add(f"video_{index}", "user_a")
+    assert counter.add("video", "user_a") == 3
+    assert len(counter._users) == 2
+
+
+class UnusedSDK:
+    def openai(self, model_name: str) -> str:
+        return model_name
+
+    def generate_text(self, **kwargs):
+        raise AssertionError("the summary was generated twice")
+
+
+def test_precompute_waits_for_a_live_summary_stream(monkeypatch):
+    transcript = CompactTranscript.from_segments(
+        "dQw4w9WgXcQ", "English", "en", False, [SegmentView(f"segment {i}", i * 2.0, 2.0) for i in range(50)]
+    )
+    monkeypatch.setattr(main, "ai_sdk", Lazy(UnusedSDK))
+
+    async def scenario() -> tuple[tuple[bool, str], str]:
+        transcript_text, _ = await main.summary_transcript(transcript.text, transcript)
+        prompt = main.get_summary_prompt(main.DetailLevel.SUMMARY, transcript_text, "")
+        key = main.content_key("summary", "gpt-5.1", prompt)
+        stream = main.summary_streams[key] = asyncio.Event()
+        job = asyncio.create_task(main.precompute_summary(transcript, main.DetailLevel.SUMMARY, "gpt-5.1"))
+        await asyncio.sleep(0.1)
+        assert not job.done()
+        # The stream completes and stores its summary
+        await main.result_cache.aset(key, "streamed summary")
+        del main.summary_streams[key]
+        stream.set()
+        return await job, key
+
+    (computed, stored_key), key = asyncio.run(scenario())
+    assert not computed
+    assert stored_key == key
+
+
+class PrecomputeSDK:
+    """generate_text and generate_object stand-ins with fixed results."""
+
+    def openai(self, model_name: str) -> str:
+        return model_name
+
+    def generate_text(self, **kwargs):
+        return SimpleNamespace(text="precomputed summary")
+
+    def generate_object(self, schema, **kwargs):
+        if schema is main.ChaptersSchema:
+            return SimpleNamespace(object=schema(chapters=[main.Chapter(title="Precomputed", start=0.0)]))
+        return SimpleNamespace(object=schema(questions=["Precomputed?"]))
+
+
+def test_mobile_requests_hit_the_precomputed_artifacts(client, monkeypatch):
+    transcript = CompactTranscript.from_segments(
+        "mobile00001", "English", "en", False, [SegmentView(f"mobile segment {i}", i * 2.0, 2.0) for i in range(50)]
+    )
+    main.cache_transcript(transcript)
+    monkeypatch.setattr(main, "ai_sdk", Lazy(PrecomputeSDK))
+
+    async def precompute():
+        for artifact in ("summary", "chapters", "questions"):
+            assert await main.precompute_artifact(artifact, transcript) == (True, ANY)
+
+    asyncio.run(precompute())
+
+    async def stream_completion(model, *, prompt=None, messages=None):
+        raise AssertionError("the summary was generated again")
+        yield
+
+    monkeypatch.setattr(main, "ai_sdk", Lazy(UnusedSDK))
+    monkeypatch.setattr(main, "stream_completion", stream_completion)
+
+    # What the mobile app sends: the segments, or their text joined with spaces, and
+    # its preferred language, English by default
+    segments = json.loads(transcript.to_json())["segments"]
+    text = " ".join(segment["text"] for segment in segments)
+    summary = client.post("/summarize", json={"video_id": "mobile00001", "transcript": text, "language": "en"})
+    assert "precomputed summary" in summary.text
+    questions = client.post(
+        "/youtube/suggest-questions", json={"video_id": "mobile00001", "transcript": text, "language": "en"}
+    )
+    assert questions.json()["questions"] == ["Precomputed?"]
+    chapters = client.post(
+        "/youtube/generate-chapters", json={"video_id": "mobile00001", "segments": segments, "language": "en"}
+    )
+    assert chapters.json()["chapters"] == [{"title": "Precomputed", "start": 0.0}]
+
+
+def test_inline_transcript_that_differs_is_used_as_is():
+    transcript = CompactTranscript.from_segments(
+        "mobile00002", "English", "en", False, [SegmentView("hello there", 0.0, 2.0)]
+    )
+    main.cache_transcript(transcript)
+
+    async def scenario():
+        return (
+            await main.stored_transcript("mobile00002", "hello there"),
+            await main.stored_transcript("mobile00002", "hello there, edited"),
+            await main.stored_transcript("mobile00002", "hello there", [1.0]),
+        )
+
+    same, edited, shifted = asyncio.run(scenario())
+    assert same is transcript
+    assert edited is None
+    assert shifted is None
+
+
+def test_done_job_runs_again_once_its_artifact_is_evicted():
+    stored = {"artifact-key"}
+    runs = []
+
+    async def job():
+        runs.append(1)
+        stored.add("artifact-key")
+        return True, "artifact-key"
+
+    async def scenario():
+        queue = PrecomputeQueue(workers=1, is_stored=lambda key: key in stored)
+        queue.start()
+        results = [queue.submit("job", 0, job)]
+        await asyncio.sleep(0.01)
+        results.append(queue.submit("job", 0, job))
+        stored.clear()
+        results.append(queue.submit("job", 0, job))
+        await asyncio.sleep(0.01)
+        await queue.close()
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert len(runs) == 2
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from prefetch import Prefetcher
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen monotonic clock; the event loop shares it, so tests only sleep(0)."""
+    now = [1000.0]
+    monkeypatch.setattr("prefetch.time.monotonic", lambda: now[0])
+    return now
+
+
+async def settle():
+    """Let the running prefetches take their next steps."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Gate:
+    """Prefetch work that runs until the test opens the gate."""
+
+    def __init__(self):
+        self.started = []
+        self.opened = asyncio.Event()
+
+    def work(self, key, fail: bool = False):
+        async def fetch():
+            self.started.append(key)
+            await self.opened.wait()
+            if fail:
+                raise ConnectionError("upstream down")
+
+        return fetch
+
+
+def test_same_key_is_prefetched_once_within_the_ttl(clock):
+    async def scenario():
+        prefetcher, gate = Prefetcher(max_concurrent=4, ttl=60), Gate()
+        first = prefetcher.schedule("video", gate.work("video"))
+        again_while_running = prefetcher.schedule("video", gate.work("video"))
+        gate.opened.set()
+        await settle()
+        again_after_it_finished = prefetcher.schedule("video", gate.work("video"))
+        clock[0] += 61
+        after_the_ttl = prefetcher.schedule("video", gate.work("video"))
+        await prefetcher.close()
+        return prefetcher, gate, [first, again_while_running, again_after_it_finished, after_the_ttl]
+
+    prefetcher, gate, results = asyncio.run(scenario())
+    assert results == [True, False, False, True]
+    assert prefetcher.report()["duplicates"] == 2
+    assert prefetcher.report()["unused"] == 1
+
+
+def test_outstanding_prefetches_are_bounded(clock):
+    async def scenario():
+        prefetcher, gate = Prefetcher(max_concurrent=2), Gate()
+        results = [prefetcher.schedule(key, gate.work(key)) for key in ["a", "b", "c", "d"]]
+        await settle()
+        in_flight = prefetcher.report()["in_flight"]
+        gate.opened.set()
+        await settle()
+        # A finished prefetch frees its slot
+        results.append(prefetcher.schedule("e", gate.work("e")))
+        await settle()
+        await prefetcher.close()
+        return prefetcher, gate, results, in_flight
+
+    prefetcher, gate, results, in_flight = asyncio.run(scenario())
+    assert results == [True, True, False, False, True]
+    assert in_flight == 2
+    assert gate.started == ["a", "b", "e"]
+    report = prefetcher.report()
+    assert (report["scheduled"], report["over_budget"], report["completed"]) == (3, 2, 3)
+    # Dropped keys were never tracked, so a request for them can prefetch later
+    assert "c" not in prefetcher._pending
+
+
+def test_failed_prefetch_can_be_scheduled_again(clock):
+    async def scenario():
+        prefetcher, gate = Prefetcher(), Gate()
+        prefetcher.schedule("video", gate.work("video", fail=True))
+        gate.opened.set()
+        await settle()
+        retried = prefetcher.schedule("video", gate.work("video"))
+        await prefetcher.close()
+        return prefetcher, retried
+
+    prefetcher, retried = asyncio.run(scenario())
+    assert retried
+    assert prefetcher.report()["failed"] == 1
+
+
+def test_claims_count_used_and_late_prefetches(clock):
+    async def scenario():
+        prefetcher, gate = Prefetcher(max_concurrent=4, ttl=60), Gate()
+        gate.opened.set()
+        prefetcher.schedule("used", gate.work("used"))
+        prefetcher.schedule("late", gate.work("late"))
+        await settle()
+        prefetcher.claim("used")
+        prefetcher.claim("never prefetched")
+        clock[0] += 61
+        prefetcher.claim("late")
+        return prefetcher.report()
+
+    report = asyncio.run(scenario())
+    assert (report["used"], report["unused"], report["use_rate"]) == (1, 1, 0.5)
+
+
+def test_tracked_keys_are_bounded(clock):
+    async def scenario():
+        prefetcher, gate = Prefetcher(max_concurrent=100, max_tracked=3), Gate()
+        gate.opened.set()
+        for index in range(5):
+            prefetcher.schedule(index, gate.work(index))
+        await prefetcher.close()
+        return prefetcher
+
+    prefetcher = asyncio.run(scenario())
+    assert list(prefetcher._pending) == [2, 3, 4]
+    assert prefetcher.report()["unused"] == 2
+
+
+def test_close_cancels_running_prefetches():
+    async def scenario():
+        prefetcher, gate = Prefetcher(), Gate()
+        prefetcher.schedule("video", gate.work("video"))
+        await settle()
+        await prefetcher.close()
+        return prefetcher.report()
+
+    report = asyncio.run(scenario())
+    assert report["in_flight"] == 0
+    assert report["completed"] == 0
@@ -0,0 +1,194 @@
+import http.client
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+import proxy_pool
+from proxy_pool import ProxyPool
+
+
+class TargetHandler(BaseHTTPRequestHandler):
+    """The upstream: 404 on /missing, else 200 with the path."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        status, body = (404, b"missing") if self.path == "/missing" else (200, self.path.encode())
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """A forwarding HTTP proxy that records connections and request headers, or answers 407."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.server.refuse:
+            self.send_response(407)
+            self.send_header("Proxy-Authenticate", 'Basic realm="proxy"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        url = urlsplit(self.path)
+        upstream = http.client.HTTPConnection(url.hostname, url.port, timeout=5)
+        upstream.request("GET", url.path)
+        response = upstream.getresponse()
+        body = response.read()
+        upstream.close()
+        self.send_response(response.status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def serve(handler, **attributes):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.requests = []
+    server.refuse = False
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def url_of(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def closed_port_url() -> str:
+    with ThreadingHTTPServer(("127.0.0.1", 0), TargetHandler) as server:
+        return url_of(server)
+
+
+@pytest.fixture
+def target():
+    with serve(TargetHandler) as server:
+        yield server
+
+
+def fetch(pool: ProxyPool, url: str) -> str:
+    def get(endpoint):
+        response = pool.session(endpoint).get(url)
+        response.raise_for_status()
+        return response.text
+
+    return pool.call(get)
+
+
+def test_keep_alive_reuses_the_proxy_connection(target):
+    with serve(ProxyHandler) as proxy:
+        pool = ProxyPool([url_of(proxy)])
+        assert fetch(pool, url_of(target) + "/a") == "/a"
+        assert fetch(pool, url_of(target) + "/b") == "/b"
+        assert len(proxy.requests) == 2
+        assert proxy.connections == 1
+
+
+def test_without_keep_alive_every_request_closes_its_connection(target):
+    with serve(ProxyHandler) as proxy:
+        pool = ProxyPool([url_of(proxy)], keep_alive=False)
+        fetch(pool, url_of(target) + "/a")
+        fetch(pool, url_of(target) + "/b")
+        assert [headers["Connection"] for headers in proxy.requests] == ["close", "close"]
+        assert proxy.connections == 2
+
+
+def test_calls_prefer_the_faster_endpoint(target):
+    with serve(ProxyHandler) as fast, serve(ProxyHandler) as slow:
+        pool = ProxyPool([url_of(fast), url_of(slow)])
+        pool.endpoints[0].latency = 0.01
+        pool.endpoints[1].latency = 1.0
+        for _ in range(5):
+            fetch(pool, url_of(target) + "/")
+        assert len(fast.requests) == 5
+        assert slow.requests == []
+
+
+def test_dead_endpoint_is_ejected_and_the_call_retried(target, monkeypatch):
+    monkeypatch.setattr(proxy_pool, "PROXY_EJECT_FAILURES", 1)
+    with serve(ProxyHandler) as proxy:
+        pool = ProxyPool([closed_port_url(), url_of(proxy)])
+        dead, alive = pool.endpoints
+        # Untried endpoints go first, so the dead one is tried once it looks fastest
+        alive.latency = 1.0
+        assert fetch(pool, url_of(target) + "/a") == "/a"
+        assert dead.failures == 1
+        assert dead.ejections == 1
+        assert not dead.healthy(proxy_pool.time.monotonic())
+        assert alive.failures == 0
+        assert len(proxy.requests) == 1
+
+
+def test_proxy_auth_failure_counts_and_is_retried(target):
+    with serve(ProxyHandler, refuse=True) as proxy:
+        pool = ProxyPool([url_of(proxy)], retries=2)
+        with pytest.raises(requests.HTTPError):
+            fetch(pool, url_of(target) + "/a")
+        endpoint = pool.endpoints[0]
+        assert len(proxy.requests) == 3
+        assert endpoint.failures == 3
+
+
+def test_upstream_answer_is_not_a_failure(target):
+    with serve(ProxyHandler) as proxy:
+        pool = ProxyPool([url_of(proxy)])
+        with pytest.raises(requests.HTTPError):
+            fetch(pool, url_of(target) + "/missing")
+        endpoint = pool.endpoints[0]
+        assert len(proxy.requests) == 1
+        assert (endpoint.requests, endpoint.failures) == (1, 0)
+
+
+def test_only_rate_limit_and_proxy_statuses_count_from_urllib():
+    pool = ProxyPool([None], retries=0)
+
+    def raise_status(status):
+        def fn(endpoint):
+            raise HTTPError("https://www.youtube.com/", status, "status", {}, None)
+
+        return fn
+
+    for status in (404, 500, 429, 407):
+        with pytest.raises(HTTPError):
+            pool.call(raise_status(status))
+    assert pool.endpoints[0].failures == 2
+
+
+def test_single_endpoint_is_not_ejected_but_reconnects(target, monkeypatch):
+    monkeypatch.setattr(proxy_pool, "PROXY_EJECT_FAILURES", 1)
+    with serve(ProxyHandler, refuse=True) as proxy:
+        pool = ProxyPool([url_of(proxy)], retries=1)
+        endpoint = pool.endpoints[0]
+        with pytest.raises(requests.HTTPError):
+            fetch(pool, url_of(target) + "/a")
+        assert endpoint.ejections == 0
+        assert endpoint.healthy(proxy_pool.time.monotonic())
+        # Each failure drops the pooled connection, for a new exit on a rotating proxy
+        assert proxy.connections == 2
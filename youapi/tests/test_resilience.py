@@ -0,0 +1,202 @@
+import asyncio
+import gc
+import threading
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, Upstream
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock that only moves when the test advances it."""
+    now = [1000.0]
+    monkeypatch.setattr("resilience.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failures=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        breaker.check()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.check()
+    assert error.value.retry_after == 30
+    assert breaker.report() == {"state": "open", "consecutive_failures": 3, "opened": 1, "rejected": 1}
+
+
+def test_half_open_lets_one_trial_through_and_closes_on_success(clock):
+    breaker = CircuitBreaker("test", failures=1, reset_seconds=30)
+    breaker.record_failure()
+    clock[0] += 10
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.check()
+    assert error.value.retry_after == 20
+
+    clock[0] += 20
+    breaker.check()
+    assert breaker.state == "half_open"
+    # Only the trial goes through until it ends
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.check()
+    breaker.check()
+
+
+def test_failed_trial_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker("test", failures=3, reset_seconds=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 30
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_released_trial_lets_the_next_call_try():
+    breaker = CircuitBreaker("test", failures=1, reset_seconds=0)
+    breaker.record_failure()
+    breaker.check()
+    breaker.release()
+    assert breaker.state == "half_open"
+    breaker.check()
+
+
+class Attempts:
+    """Blocking fake upstream: each attempt waits for its gate, then returns or raises its outcome."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.gates = [threading.Event() for _ in outcomes]
+        self.started = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, used: list):
+        with self._lock:
+            index = self.started
+            self.started += 1
+        used.append(index)
+        self.gates[index].wait(5)
+        if isinstance(self.outcomes[index], BaseException):
+            raise self.outcomes[index]
+        return self.outcomes[index]
+
+
+@pytest.fixture
+def unhandled(monkeypatch):
+    """Errors reported to the event loop's exception handler, e.g. unretrieved task exceptions."""
+    monkeypatch.setattr(resilience, "HEDGE_DEFAULT_DELAY", 0.05)
+    return []
+
+
+def run(scenario, unhandled):
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        result = await scenario()
+        gc.collect()
+        await asyncio.sleep(0)
+        return result
+
+    return asyncio.run(main())
+
+
+def test_slow_attempt_is_hedged_and_its_late_error_is_handled(unhandled):
+    upstream = Upstream("test", "transcripts")
+    attempts = Attempts(ConnectionError("slow endpoint"), "hedged result")
+
+    async def scenario():
+        call = asyncio.create_task(upstream.call(attempts))
+        await asyncio.sleep(0.1)
+        # The hedge answers first, then the first attempt fails
+        attempts.gates[1].set()
+        result = await call
+        attempts.gates[0].set()
+        await asyncio.sleep(0.05)
+        return result
+
+    assert run(scenario, unhandled) == "hedged result"
+    assert attempts.started == 2
+    assert (upstream.hedged, upstream.hedge_wins) == (1, 1)
+    assert upstream.breaker.state == "closed"
+    assert unhandled == []
+
+
+def test_fast_attempt_is_not_hedged(unhandled):
+    upstream = Upstream("test", "transcripts")
+    attempts = Attempts("result")
+    attempts.gates[0].set()
+    assert run(lambda: upstream.call(attempts), unhandled) == "result"
+    assert attempts.started == 1
+    assert upstream.hedged == 0
+
+
+def test_call_fails_once_every_attempt_has_failed(unhandled):
+    upstream = Upstream("test", "transcripts")
+    attempts = Attempts(ConnectionError("first"), ConnectionError("second"))
+
+    async def scenario():
+        call = asyncio.create_task(upstream.call(attempts))
+        await asyncio.sleep(0.1)
+        attempts.gates[0].set()
+        await asyncio.sleep(0.05)
+        # One attempt left, so the call is still waiting
+        assert not call.done()
+        attempts.gates[1].set()
+        return await call
+
+    with pytest.raises(ConnectionError, match="first"):
+        run(scenario, unhandled)
+    assert upstream.breaker.consecutive_failures == 1
+    assert unhandled == []
+
+
+def test_answers_are_raised_without_failing_the_breaker(unhandled):
+    upstream = Upstream("test", "transcripts", answers=(LookupError,))
+    attempts = Attempts(LookupError("transcripts disabled"))
+    attempts.gates[0].set()
+    with pytest.raises(LookupError):
+        run(lambda: upstream.call(attempts), unhandled)
+    assert upstream.breaker.consecutive_failures == 0
+
+
+def test_cancelled_call_cancels_its_attempts(unhandled):
+    upstream = Upstream("test", "transcripts")
+    attempts = Attempts(ConnectionError("first"), ConnectionError("second"))
+
+    async def scenario():
+        call = asyncio.create_task(upstream.call(attempts))
+        await asyncio.sleep(0.1)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        for gate in attempts.gates:
+            gate.set()
+        await asyncio.sleep(0.05)
+
+    run(scenario, unhandled)
+    assert attempts.started == 2
+    assert upstream.in_flight == 0
+    # Cancelling says nothing about the upstream, and a trial may start again
+    assert upstream.breaker.consecutive_failures == 0
+    assert unhandled == []
+
+
+def test_hedge_delay_follows_recent_latencies(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_MIN_SAMPLES", 10)
+    upstream = Upstream("test", "transcripts")
+    assert upstream.latency.hedge_delay() == resilience.HEDGE_DEFAULT_DELAY
+    for index in range(100):
+        upstream.latency.observe(0.5 + index / 100)
+    assert upstream.latency.hedge_delay() == pytest.approx(1.45)
+    assert upstream.latency.percentile(50) == pytest.approx(1.0)
@@ -0,0 +1,52 @@
+import math
+
+from prompts import Window
+from retrieval import BM25Index, tokenize
+
+WINDOWS = [
+    Window("welcome to the show today we talk about cooking", 0.0, 30.0),
+    Window("the attention mechanism lets the model weigh every token", 30.0, 60.0),
+    Window("attention attention attention is all you need they said", 60.0, 90.0),
+    Window("a long tangent about the weather the weather was nice and the weather was warm", 90.0, 120.0),
+    Window("finally we wrap up and thank our sponsor", 120.0, 150.0),
+]
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("Attention, is ALL you-need!") == ["attention", "is", "all", "you", "need"]
+
+
+def test_rare_terms_weigh_more_than_common_ones():
+    index = BM25Index(WINDOWS)
+    assert index.idf["sponsor"] > index.idf["attention"] > index.idf["the"]
+    assert math.isclose(index.idf["sponsor"], math.log(1 + (5 - 1 + 0.5) / (1 + 0.5)))
+
+
+def test_search_ranks_by_term_frequency():
+    index = BM25Index(WINDOWS)
+    assert index.search("attention", 1) == [WINDOWS[2]]
+
+
+def test_search_returns_the_best_windows_in_transcript_order():
+    index = BM25Index(WINDOWS)
+    # The sponsor window scores highest but comes last in the transcript
+    assert index.search("sponsor attention", 2) == [WINDOWS[2], WINDOWS[4]]
+
+
+def test_longer_windows_are_penalized():
+    short = Window("weather report", 0.0, 10.0)
+    long = Window("weather " + " ".join(f"filler{i}" for i in range(50)), 10.0, 20.0)
+    index = BM25Index([long, short, Window("unrelated", 20.0, 30.0)])
+    assert index.search("weather", 1) == [short]
+
+
+def test_unknown_terms_match_nothing():
+    index = BM25Index(WINDOWS)
+    assert index.search("quantum chromodynamics", 3) == []
+    assert BM25Index([]).search("anything", 3) == []
+
+
+def test_sample_spreads_windows_across_the_transcript():
+    index = BM25Index(WINDOWS)
+    assert index.sample(2) == [WINDOWS[0], WINDOWS[2]]
+    assert index.sample(10) == WINDOWS
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import main
+from concurrency import SingleFlight
+from transcripts import CompactTranscript, SegmentView
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.report() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_concurrent_callers_share_the_exception():
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    assert [str(error) for error in asyncio.run(scenario())] == ["upstream down"] * 3
+
+
+def test_a_caller_going_away_does_not_cancel_the_call():
+    async def fetch():
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def scenario():
+        flight = SingleFlight()
+        leaving = asyncio.create_task(flight.do("key", fetch))
+        staying = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.02)
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(scenario()) == "result"
+
+
+@pytest.fixture
+def counting_loader(monkeypatch):
+    """Replaces the upstream transcript fetch with a slow one that counts its calls."""
+    calls = []
+    lock = threading.Lock()
+
+    def load_transcript(video_id, lang, used=None):
+        with lock:
+            calls.append((video_id, lang))
+        time.sleep(0.2)
+        return CompactTranscript.from_segments(video_id, "English", "en", False, [SegmentView("hello there", 0.0, 2.0)])
+
+    monkeypatch.setattr(main, "load_transcript", load_transcript)
+    return calls
+
+
+def test_transcript_by_video_id_and_without_language_share_one_fetch(counting_loader):
+    async def scenario():
+        return await asyncio.gather(
+            main.fetch_transcript_text("flight00001"),
+            main.get_transcript_data("flight00001", None),
+            main.get_transcript_data("flight00001", "en"),
+        )
+
+    (text, by_id), without_lang, english = asyncio.run(scenario())
+    assert counting_loader == [("flight00001", "en")]
+    assert text == "hello there"
+    assert by_id is without_lang is english
+
+
+def test_prefetch_shares_the_fetch_of_the_request_it_anticipates(counting_loader, monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", True)
+
+    async def scenario():
+        main.prefetch_transcript("flight00002")
+        await asyncio.sleep(0.05)
+        return await main.get_transcript_data("flight00002", None)
+
+    assert asyncio.run(scenario()).video_id == "flight00002"
+    assert counting_loader == [("flight00002", "en")]
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+import main
+import streaming
+from streaming import SSE_DONE, SSE_KEEPALIVE, StreamStats, coalesce_sse, sse_data
+
+
+async def deltas_every(interval: float, count: int, produced: list | None = None):
+    for i in range(count):
+        if produced is not None:
+            produced.append(i)
+        yield f"t{i} "
+        await asyncio.sleep(interval)
+
+
+async def collect(deltas) -> list[tuple[float, str]]:
+    """Every frame with the time it was sent, from the start of the stream."""
+    started = time.perf_counter()
+    return [(time.perf_counter() - started, frame) async for frame in coalesce_sse(deltas, StreamStats("test"))]
+
+
+def test_first_delta_is_sent_alone_and_the_rest_batched(monkeypatch):
+    monkeypatch.setattr(streaming, "SSE_FLUSH_INTERVAL", 0.05)
+    frames = [frame for _, frame in asyncio.run(collect(deltas_every(0.005, 40)))]
+    assert frames[0] == sse_data("t0 ")
+    assert frames[-1] == SSE_DONE
+    # 40 deltas over about 0.2 s in frames of at most 0.05 s
+    assert 3 <= len(frames) - 2 <= 10
+    body = "".join(frame.removeprefix("data: ").removesuffix("\n\n") for frame in frames[:-1])
+    assert body == "".join(f"t{i} " for i in range(40))
+
+
+def test_frame_is_flushed_once_it_reaches_the_byte_limit(monkeypatch):
+    monkeypatch.setattr(streaming, "SSE_FLUSH_INTERVAL", 10)
+    monkeypatch.setattr(streaming, "SSE_FLUSH_BYTES", 9)
+
+    async def burst():
+        for i in range(7):
+            yield f"t{i} "
+
+    frames = [frame for _, frame in asyncio.run(collect(burst()))]
+    assert frames == [sse_data("t0 "), sse_data("t1 t2 t3 "), sse_data("t4 t5 t6 "), SSE_DONE]
+
+
+def test_keep_alives_are_sent_while_the_model_is_silent(monkeypatch):
+    monkeypatch.setattr(streaming, "SSE_KEEPALIVE_INTERVAL", 0.1)
+
+    async def thinking():
+        await asyncio.sleep(0.35)
+        yield "answer"
+
+    sent = asyncio.run(collect(thinking()))
+    keep_alive_times = [at for at, frame in sent if frame == SSE_KEEPALIVE]
+    assert len(keep_alive_times) == 3
+    for expected, at in zip([0.1, 0.2, 0.3], keep_alive_times):
+        assert expected <= at < expected + 0.05
+    assert [frame for _, frame in sent][3:] == [sse_data("answer"), SSE_DONE]
+
+
+def test_paused_client_pauses_the_upstream(monkeypatch):
+    monkeypatch.setattr(streaming, "SSE_MAX_PENDING", 8)
+    produced = []
+
+    async def scenario():
+        frames = coalesce_sse(deltas_every(0, 1000, produced), StreamStats("test"))
+        await frames.__anext__()
+        # The client stops reading
+        await asyncio.sleep(0.2)
+        await frames.aclose()
+
+    asyncio.run(scenario())
+    # The first delta, a full queue and the one waiting to be queued
+    assert len(produced) <= 8 + 2
+
+
+def test_upstream_error_ends_the_stream_with_it():
+    async def failing():
+        yield "partial"
+        raise RuntimeError("provider error")
+
+    async def scenario():
+        return [frame async for frame in coalesce_sse(failing(), StreamStats("test"))]
+
+    with pytest.raises(RuntimeError, match="provider error"):
+        asyncio.run(scenario())
+
+
+def test_replayed_summary_ends_like_a_live_stream(monkeypatch):
+    monkeypatch.setattr(main, "SUMMARY_REPLAY_CHUNK_SIZE", 4)
+    monkeypatch.setattr(main, "SUMMARY_REPLAY_INTERVAL", 0)
+
+    async def scenario():
+        return [frame async for frame in main.replay_summary("a cached summary")]
+
+    frames = asyncio.run(scenario())
+    assert frames[0] == sse_data("a ca")
+    assert frames[-1] == SSE_DONE
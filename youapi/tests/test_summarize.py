@@ -0,0 +1,75 @@
+import asyncio
+
+from fastapi import Request
+
+import main
+from streaming import SSE_DONE, sse_data
+
+TRANSCRIPT = "a transcript about resuming summaries after a disconnect"
+
+
+class FakeModel:
+    """stream_completion stand-in: streams `words`, or the rest of them when asked to continue."""
+
+    def __init__(self, words: list[str], interval: float):
+        self.words = words
+        self.interval = interval
+        self.prompts: list[str] = []
+
+    async def stream_completion(self, model, *, prompt=None, messages=None):
+        self.prompts.append(prompt)
+        words = self.words
+        if "Continue the summary" in prompt:
+            words = words[len(self.words) // 2:]
+        for word in words:
+            yield word
+            await asyncio.sleep(self.interval)
+
+
+def summarize(video_id: str):
+    return main.summarize_video(
+        main.SummarizeRequest(video_id=video_id, transcript=TRANSCRIPT), Request({"type": "http"})
+    )
+
+
+def test_disconnected_summary_is_resumed_from_its_partial(monkeypatch):
+    words = [f"w{i} " for i in range(20)]
+    model = FakeModel(words, interval=0.01)
+    monkeypatch.setattr(main, "stream_completion", model.stream_completion)
+    monkeypatch.setattr(main, "SUMMARY_PARTIAL_MIN_CHARS", 10)
+    request = main.SummarizeRequest(video_id="resume00001", transcript=TRANSCRIPT)
+    prompt = main.get_summary_prompt(request.detail_level, TRANSCRIPT, "")
+    cache_key = main.content_key("summary", request.model.value, prompt)
+    partial_key = main.content_key("summary-partial", request.model.value, prompt)
+
+    async def scenario():
+        # The client reads until half the summary has been generated, then goes away
+        response = await summarize("resume00001")
+        frames = response.body_iterator
+        received = ""
+        async for frame in frames:
+            received += frame.removeprefix("data: ").removesuffix("\n\n")
+            if received.count("w") >= len(words) // 2:
+                break
+        await frames.aclose()
+        await asyncio.sleep(0.1)
+        in_flight_after_disconnect = dict(main.summary_streams)
+        partial = await main.result_cache.aget(partial_key)
+
+        response = await summarize("resume00001")
+        resumed = [frame async for frame in response.body_iterator]
+        return in_flight_after_disconnect, partial, resumed
+
+    in_flight, partial, resumed = asyncio.run(scenario())
+    assert cache_key not in in_flight
+    assert partial == "".join(words[: len(partial.split())])
+
+    # The partial is replayed first, and the model is asked to continue after it
+    assert resumed[0] == sse_data(partial)
+    assert resumed[-1] == SSE_DONE
+    assert partial in model.prompts[-1]
+    assert cache_key not in main.summary_streams
+
+    stored = main.result_cache.get(cache_key)
+    assert stored.startswith(partial)
+    assert main.result_cache.get(partial_key) is None
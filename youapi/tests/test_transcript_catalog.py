@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+from youtube_transcript_api import TranscriptList
+
+from transcripts import TranscriptCatalog
+
+# Tests run TranscriptCatalog against the youtube-transcript-api internals it uses,
+# so a version bump that changes them fails here
+
+TRANSCRIPT_XML = '<transcript><text start="0.5" dur="1.5">bonjour</text></transcript>'
+
+
+def caption(language: str, code: str, kind: str = "", translatable: bool = True) -> dict:
+    return {
+        "baseUrl": f"https://www.youtube.com/api/timedtext?v=catalog0001&lang={code}&fmt=srv3",
+        "name": {"runs": [{"text": language}]},
+        "languageCode": code,
+        "kind": kind,
+        "isTranslatable": translatable,
+    }
+
+
+def transcript_list(*captions: dict, translations: tuple[str, ...] = ("fr", "de")) -> TranscriptList:
+    names = {"fr": "French", "de": "German", "vi": "Vietnamese"}
+    return TranscriptList.build(
+        None,
+        "catalog0001",
+        {
+            "captionTracks": list(captions),
+            "translationLanguages": [
+                {"languageCode": code, "languageName": {"runs": [{"text": names[code]}]}} for code in translations
+            ],
+        },
+    )
+
+
+class RecordingSession:
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+        return SimpleNamespace(status_code=200, text=TRANSCRIPT_XML, raise_for_status=lambda: None)
+
+
+def test_catalog_keeps_the_listed_tracks_and_translation_languages():
+    catalog = TranscriptCatalog.from_transcript_list(
+        transcript_list(caption("English", "en", kind="asr"), caption("Spanish", "es", translatable=False))
+    )
+    # Manually created tracks come first
+    assert catalog.language_codes == ["es", "en"]
+    assert catalog.find("en").url == "https://www.youtube.com/api/timedtext?v=catalog0001&lang=en"
+    assert catalog.find("en").is_generated
+    assert catalog.find("ja") is None
+    assert catalog.translation_languages == {"fr": "French", "de": "German"}
+    assert TranscriptCatalog.from_bytes(catalog.to_bytes()) == catalog
+
+
+def test_select_prefers_a_listed_track_then_a_translation_then_english():
+    catalog = TranscriptCatalog.from_transcript_list(
+        transcript_list(caption("Spanish", "es"), caption("English", "en"), caption("Italian", "it", translatable=False))
+    )
+    assert catalog.select("it") == (catalog.find("it"), None)
+    # Translated from English when English is translatable
+    assert catalog.select("fr") == (catalog.find("en"), "fr")
+    assert catalog.select("ja") == (catalog.find("en"), None)
+    assert catalog.select(None) == (catalog.find("en"), None)
+    assert TranscriptCatalog("catalog0001", [], {}).select("en") is None
+
+
+def test_select_translates_from_the_first_translatable_track_without_english():
+    catalog = TranscriptCatalog.from_transcript_list(
+        transcript_list(caption("Italian", "it", translatable=False), caption("Spanish", "es"))
+    )
+    assert catalog.select("de") == (catalog.find("es"), "de")
+    assert catalog.select("ja") == (catalog.find("it"), None)
+
+
+def test_transcript_fetches_the_track_url_through_the_given_session():
+    catalog = TranscriptCatalog.from_transcript_list(transcript_list(caption("English", "en")))
+    session = RecordingSession()
+    fetched = catalog.transcript(session, catalog.find("en")).fetch()
+    assert session.urls == ["https://www.youtube.com/api/timedtext?v=catalog0001&lang=en"]
+    assert (fetched.language_code, fetched.snippets[0].text, fetched.snippets[0].start) == ("en", "bonjour", 0.5)
+
+
+def test_translated_transcript_is_fetched_from_the_listed_url_with_tlang():
+    catalog = TranscriptCatalog.from_transcript_list(transcript_list(caption("English", "en")))
+    # A catalog read back from the cache fetches without listing the video again
+    catalog = TranscriptCatalog.from_bytes(catalog.to_bytes())
+    session = RecordingSession()
+    track, translate_to = catalog.select("fr")
+    fetched = catalog.transcript(session, track, translate_to).fetch()
+    assert session.urls == ["https://www.youtube.com/api/timedtext?v=catalog0001&lang=en&tlang=fr"]
+    assert (fetched.language, fetched.language_code, fetched.is_generated) == ("French", "fr", True)
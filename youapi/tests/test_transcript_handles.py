@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from transcripts import CompactTranscript, SegmentView
+
+
+def make_transcript(video_id: str, language_code: str) -> CompactTranscript:
+    return CompactTranscript.from_segments(
+        video_id, language_code, language_code, False, [SegmentView(f"in {language_code}", 0.0, 2.0)]
+    )
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """The languages the fake upstream serves per video; anything else falls back to English."""
+    available: dict[str, set[str]] = {}
+    calls = []
+
+    def load_transcript(video_id, lang, used=None):
+        calls.append((video_id, lang))
+        language_code = lang if lang in available[video_id] else "en"
+        main.alias_transcript(video_id, lang, language_code)
+        transcript = make_transcript(video_id, language_code)
+        main.cache_transcript(transcript)
+        return transcript
+
+    monkeypatch.setattr(main, "load_transcript", load_transcript)
+    return available, calls
+
+
+def test_handle_is_served_from_the_cache(upstream):
+    available, calls = upstream
+    transcript = make_transcript("handle00001", "vi")
+    main.cache_transcript(transcript)
+    assert asyncio.run(main.transcript_from_handle(transcript.transcript_handle)) is transcript
+    assert calls == []
+
+
+def test_evicted_handle_is_fetched_again_in_its_language(upstream):
+    available, calls = upstream
+    available["handle00002"] = {"en", "vi"}
+    transcript = asyncio.run(main.transcript_from_handle("handle00002:vi"))
+    assert transcript.language_code == "vi"
+    assert calls == [("handle00002", "vi")]
+
+
+def test_handle_whose_language_is_gone_is_refused(upstream):
+    available, calls = upstream
+    available["handle00003"] = {"en"}
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main.transcript_from_handle("handle00003:vi"))
+    assert raised.value.status_code == 410
+    # Served from the alias the failed refetch left, and still refused
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main.transcript_from_handle("handle00003:vi"))
+    assert raised.value.status_code == 410
+    assert calls == [("handle00003", "vi")]
+
+
+def test_malformed_handle_is_rejected():
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main.transcript_from_handle("not-a-handle"))
+    assert raised.value.status_code == 400
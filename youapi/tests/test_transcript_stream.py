@@ -0,0 +1,62 @@
+import json
+
+import main
+from transcripts import CompactTranscript, SegmentView
+
+VIDEO_ID = "stream00001"
+
+
+def cached_transcript() -> CompactTranscript:
+    transcript = CompactTranscript.from_segments(
+        VIDEO_ID, "English", "en", False, [SegmentView(f"segment {i}", i * 2.0, 2.0) for i in range(10)]
+    )
+    main.cache_transcript(transcript)
+    return transcript
+
+
+def stream(client, **params):
+    response = client.get("/youtube/transcript/stream", params={"video_id": VIDEO_ID, **params})
+    assert response.status_code == 200
+    header, *segments = [json.loads(line) for line in response.text.splitlines()]
+    return response, header, segments
+
+
+def test_stream_sends_metadata_then_every_segment(client):
+    transcript = cached_transcript()
+    response, header, segments = stream(client)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["etag"] == f'W/"{transcript.transcript_handle}"'
+    assert header == {
+        "video_id": VIDEO_ID,
+        "language": "English",
+        "language_code": "en",
+        "is_generated": False,
+        "transcript_handle": transcript.transcript_handle,
+    }
+    assert segments == json.loads(transcript.to_json())["segments"]
+
+
+def test_range_keeps_segments_starting_inside_it(client):
+    cached_transcript()
+    _, _, segments = stream(client, **{"from": 3, "to": 10})
+    assert [segment["start"] for segment in segments] == [4.0, 6.0, 8.0]
+
+
+def test_open_ended_ranges(client):
+    cached_transcript()
+    assert [s["start"] for s in stream(client, **{"from": 15})[2]] == [16.0, 18.0]
+    assert [s["start"] for s in stream(client, to=4)[2]] == [0.0, 2.0]
+
+
+def test_range_past_the_end_sends_only_metadata(client):
+    cached_transcript()
+    _, header, segments = stream(client, **{"from": 100})
+    assert header["video_id"] == VIDEO_ID
+    assert segments == []
+
+
+def test_segments_are_sent_in_batches():
+    transcript = cached_transcript()
+    chunks = list(transcript.iter_ndjson(2.0, 16.0, batch_size=3))
+    assert [chunk.count(b"\n") for chunk in chunks] == [1, 3, 3, 1]
+    assert b"".join(chunks[1:]).decode().splitlines()[0] == '{"text":"segment 1","start":2.0,"duration":2.0}'
@@ -0,0 +1,291 @@
+import json
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass
+from typing import NamedTuple
+
+from requests import Session
+from youtube_transcript_api import Transcript, TranscriptList
+
+# Private: the version is pinned in pyproject.toml, see tests/test_transcript_catalog.py
+from youtube_transcript_api._transcripts import _TranslationLanguage
+
+from prompts import Segment
+
+encode_string = json.encoder.encode_basestring
+
+
+class SegmentView(NamedTuple):
+    text: str
+    start: float
+    duration: float
+
+
+class CompactTranscript:
+    """
+    Columnar transcript representation.
+
+    Segment starts and durations live in float arrays and all segment texts in one
+    space-joined string indexed by character offsets, so a long transcript costs a
+    few buffers instead of thousands of objects. The joined string doubles as the
+    full text for LLM prompts.
+    """
+
+    __slots__ = (
+        "video_id",
+        "language",
+        "language_code",
+        "is_generated",
+        "text",
+        "offsets",
+        "starts",
+        "durations",
+    )
+
+    def __init__(
+        self,
+        video_id: str,
+        language: str,
+        language_code: str,
+        is_generated: bool,
+        text: str,
+        offsets: array,
+        starts: array,
+        durations: array,
+    ):
+        self.video_id = video_id
+        self.language = language
+        self.language_code = language_code
+        self.is_generated = is_generated
+        self.text = text
+        # Segment i is text[offsets[i]:offsets[i + 1] - 1]; the -1 skips the joining space
+        self.offsets = offsets
+        self.starts = starts
+        self.durations = durations
+
+    @classmethod
+    def from_segments(
+        cls,
+        video_id: str,
+        language: str,
+        language_code: str,
+        is_generated: bool,
+        segments: Iterable[Segment],
+    ) -> "CompactTranscript":
+        texts = []
+        offsets = array("I", [0])
+        starts = array("d")
+        durations = array("d")
+        position = 0
+        for segment in segments:
+            texts.append(segment.text)
+            starts.append(segment.start)
+            durations.append(segment.duration)
+            position += len(segment.text) + 1
+            offsets.append(position)
+        return cls(
+            video_id,
+            language,
+            language_code,
+            is_generated,
+            " ".join(texts),
+            offsets,
+            starts,
+            durations,
+        )
+
+    @property
+    def transcript_handle(self) -> str:
+        return f"{self.video_id}:{self.language_code}"
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[SegmentView]:
+        text, offsets = self.text, self.offsets
+        for i, (start, duration) in enumerate(zip(self.starts, self.durations)):
+            yield SegmentView(text[offsets[i]:offsets[i + 1] - 1], start, duration)
+
+    def _header_json(self) -> str:
+        return (
+            f'{{"video_id":{encode_string(self.video_id)},'
+            f'"language":{encode_string(self.language)},'
+            f'"language_code":{encode_string(self.language_code)},'
+            f'"is_generated":{"true" if self.is_generated else "false"},'
+            f'"transcript_handle":{encode_string(self.transcript_handle)}'
+        )
+
+    def _segment_json(self, i: int) -> str:
+        text = self.text[self.offsets[i]:self.offsets[i + 1] - 1]
+        return (
+            f'{{"text":{encode_string(text)},'
+            f'"start":{self.starts[i]!r},"duration":{self.durations[i]!r}}}'
+        )
+
+    def segment_range(self, start: float | None = None, end: float | None = None) -> range:
+        """Indexes of segments starting within [start, end); either bound may be omitted."""
+        first = 0 if start is None else bisect_left(self.starts, start)
+        last = len(self) if end is None else bisect_left(self.starts, end)
+        return range(first, max(first, last))
+
+    def iter_ndjson(
+        self, start: float | None = None, end: float | None = None, batch_size: int = 200
+    ) -> Iterator[bytes]:
+        """Yield a metadata line, then one JSON line per segment, in batches."""
+        yield f"{self._header_json()}}}\n".encode()
+        indexes = self.segment_range(start, end)
+        for batch_start in range(indexes.start, indexes.stop, batch_size):
+            batch = range(batch_start, min(batch_start + batch_size, indexes.stop))
+            yield "".join(f"{self._segment_json(i)}\n" for i in batch).encode()
+
+    def to_json(self) -> bytes:
+        """Serialize to the TranscriptResponse JSON shape without building models."""
+        segments = ",".join(self._segment_json(i) for i in range(len(self)))
+        return f'{self._header_json()},"segments":[{segments}]}}'.encode()
+
+    def to_bytes(self) -> bytes:
+        """Binary encoding for the on-disk cache: JSON header, raw arrays, UTF-8 text."""
+        text = self.text.encode()
+        header = json.dumps({
+            "video_id": self.video_id,
+            "language": self.language,
+            "language_code": self.language_code,
+            "is_generated": self.is_generated,
+            "count": len(self),
+        }).encode()
+        return b"".join([
+            struct.pack("<I", len(header)),
+            header,
+            self.starts.tobytes(),
+            self.durations.tobytes(),
+            self.offsets.tobytes(),
+            text,
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompactTranscript":
+        (header_size,) = struct.unpack_from("<I", data)
+        position = 4 + header_size
+        header = json.loads(data[4:position])
+        count = header["count"]
+
+        def take(typecode: str, length: int) -> array:
+            nonlocal position
+            values = array(typecode)
+            size = values.itemsize * length
+            values.frombytes(data[position:position + size])
+            position += size
+            return values
+
+        starts = take("d", count)
+        durations = take("d", count)
+        offsets = take("I", count + 1)
+        return cls(
+            header["video_id"],
+            header["language"],
+            header["language_code"],
+            header["is_generated"],
+            data[position:].decode(),
+            offsets,
+            starts,
+            durations,
+        )
+
+
+@dataclass
+class CatalogTrack:
+    language: str
+    language_code: str
+    is_generated: bool
+    url: str
+    is_translatable: bool
+
+
+@dataclass
+class TranscriptCatalog:
+    """
+    The transcripts YouTube lists for a video, as plain data.
+
+    Tracks keep their signed timedtext URLs, so a transcript in any listed or
+    translation language can be fetched in a single request without listing the
+    video again. Manually created tracks come before generated ones.
+    """
+
+    video_id: str
+    tracks: list[CatalogTrack]
+    # Language code to name for every language translatable tracks can be translated into
+    translation_languages: dict[str, str]
+
+    @classmethod
+    def from_transcript_list(cls, transcript_list: TranscriptList) -> "TranscriptCatalog":
+        translation_languages = {}
+        tracks = []
+        for transcript in transcript_list:
+            tracks.append(
+                CatalogTrack(
+                    transcript.language,
+                    transcript.language_code,
+                    transcript.is_generated,
+                    transcript._url,
+                    transcript.is_translatable,
+                )
+            )
+            for language in transcript.translation_languages:
+                translation_languages[language.language_code] = language.language
+        return cls(transcript_list.video_id, tracks, translation_languages)
+
+    @property
+    def language_codes(self) -> list[str]:
+        return [track.language_code for track in self.tracks]
+
+    def find(self, language_code: str) -> CatalogTrack | None:
+        return next((track for track in self.tracks if track.language_code == language_code), None)
+
+    def select(self, lang: str | None) -> tuple[CatalogTrack, str | None] | None:
+        """
+        Pick the track to fetch and the language to translate it into, if any.
+
+        Priority: lang itself → lang translated from a translatable track (English
+        first) → English → the first listed track. None when nothing is listed.
+        """
+        if not self.tracks:
+            return None
+        if lang and (track := self.find(lang)):
+            return track, None
+        if lang and lang in self.translation_languages:
+            sources = [track for track in self.tracks if track.is_translatable]
+            if sources:
+                return (self.find("en") if self.find("en") in sources else sources[0]), lang
+        return self.find("en") or self.tracks[0], None
+
+    def transcript(self, http_client: Session, track: CatalogTrack, translate_to: str | None = None) -> Transcript:
+        """A youtube-transcript-api Transcript for track that fetches through http_client."""
+        transcript = Transcript(
+            http_client,
+            self.video_id,
+            track.url,
+            track.language,
+            track.language_code,
+            track.is_generated,
+            [
+                _TranslationLanguage(language, language_code)
+                for language_code, language in self.translation_languages.items()
+            ]
+            if track.is_translatable
+            else [],
+        )
+        return transcript.translate(translate_to) if translate_to else transcript
+
+    def to_bytes(self) -> bytes:
+        return json.dumps(asdict(self)).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TranscriptCatalog":
+        raw = json.loads(data)
+        return cls(
+            raw["video_id"],
+            [CatalogTrack(**track) for track in raw["tracks"]],
+            raw["translation_languages"],
+        )